@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def sync_background_tasks(settings):
+    """Фоновые задачи картинок выполняются сразу, как в тестах приложений.
+
+    Иначе пул дописывает варианты в MEDIA_ROOT уже после теста, когда
+    временный каталог удаляется.
+    """
+    settings.BACKGROUND_WORKERS = 0
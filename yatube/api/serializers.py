@@ -0,0 +1,45 @@
+"""Представление объектов в JSON API.
+
+Поля перечислены явно: ответ не меняется при добавлении полей в модели,
+а queryset читает только нужные столбцы (posts.feeds).
+"""
+
+
+def serialize_post(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created,
+    }
+
+
+def serialize_group(group):
+    return {
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+    }
+
+
+def serialize_profile(author, stats, following):
+    return {
+        'username': author.username,
+        'first_name': author.first_name,
+        'last_name': author.last_name,
+        'posts_count': stats.posts_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
+        'following': following,
+    }
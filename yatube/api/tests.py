@@ -0,0 +1,117 @@
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='TestReader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, name, status=200, **params):
+        kwargs = params.pop('kwargs', {})
+        response = self.client.get(
+            reverse(f'api:{name}', kwargs=kwargs), params
+        )
+        self.assertEqual(response.status_code, status)
+        return response.json()
+
+    def test_post_list_fields_and_queries(self):
+        """Сто постов отдаются одним ответом за один запрос к базе."""
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=self.author)
+            for number in range(120)
+        )
+        with self.assertNumQueries(1):
+            data = self.get('post_list', limit=100)
+        self.assertEqual(len(data['results']), 100)
+        self.assertEqual(
+            set(data['results'][0]),
+            {'id', 'text', 'pub_date', 'author', 'group', 'image'},
+        )
+        rest = self.get('post_list', limit=100, cursor=data['next'])
+        self.assertEqual(len(rest['results']), 21)
+        self.assertIsNone(rest['next'])
+        self.assertEqual(rest['results'][-1]['group'], 'test-slug')
+
+    def test_post_detail(self):
+        """can_edit - только у автора, несуществующий пост - 404."""
+        kwargs = {'post_id': self.post.pk}
+        data = self.get('post_detail', kwargs=kwargs)
+        self.assertEqual(data['text'], 'Тестовый пост')
+        self.assertFalse(data['can_edit'])
+        self.client.force_login(self.author)
+        self.assertTrue(self.get('post_detail', kwargs=kwargs)['can_edit'])
+        data = self.get('post_detail', 404, kwargs={'post_id': 0})
+        self.assertIn('detail', data)
+
+    def test_comments_groups_and_profiles(self):
+        """Комментарии, группы и профили отдаются по своим адресам."""
+        comments = self.get('post_comments', kwargs={'post_id': self.post.pk})
+        self.assertEqual(
+            [(row['author'], row['text']) for row in comments['results']],
+            [('TestReader', 'Комментарий')],
+        )
+        groups = self.get('group_list')
+        self.assertEqual(
+            [group['slug'] for group in groups['results']], ['test-slug']
+        )
+        group_posts = self.get('group_posts', kwargs={'slug': 'test-slug'})
+        self.assertEqual(len(group_posts['results']), 1)
+        self.client.force_login(self.reader)
+        Follow.objects.create(user=self.reader, author=self.author)
+        profile = self.get('profile', kwargs={'username': 'TestAuthor'})
+        self.assertEqual(profile['posts_count'], 1)
+        self.assertEqual(profile['followers_count'], 1)
+        self.assertTrue(profile['following'])
+
+    def test_follow_feed_requires_login(self):
+        """Лента подписок - только для авторизованных."""
+        self.get('follow_feed', 401)
+        self.client.force_login(self.reader)
+        self.assertEqual(self.get('follow_feed')['results'], [])
+        Follow.objects.create(user=self.reader, author=self.author)
+        results = self.get('follow_feed')['results']
+        self.assertEqual([post['id'] for post in results], [self.post.pk])
+
+    def test_etag_and_gzip(self):
+        """Ответ сжимается, а повторный запрос получает 304."""
+        # Короткие ответы gzip не сжимает
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=self.author)
+            for number in range(10)
+        )
+        url = reverse('api:post_list')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), 11)
+        response = self.client.get(
+            url,
+            HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
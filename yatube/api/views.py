@@ -0,0 +1,159 @@
+"""JSON API для чтения постов, групп, профилей, лент и комментариев.
+
+Списки листаются курсором (параметры cursor и limit), ответы
+поддерживают условные запросы по ETag и сжимаются gzip.
+"""
+from functools import wraps
+
+from django.http import JsonResponse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from core.paginator import CursorPaginator
+from core.replicas import read_replica
+from posts.conditional import (
+    conditional_page, group_scopes, index_scopes, post_scopes, profile_scopes,
+)
+from posts.feeds import COMMENT_ORDERING, for_comments, for_feed
+from posts.models import Comment, Follow, Group, Post, User
+from posts.stats import get_stats
+from posts.timeline import TIMELINE_ORDERING, get_timeline
+
+from .serializers import (
+    serialize_comment, serialize_group, serialize_post, serialize_profile,
+)
+
+PAGE_SIZE: int = 20
+MAX_PAGE_SIZE: int = 100
+
+
+def groups_scopes():
+    return ['groups']
+
+
+def api_view(scopes_func=None):
+    """Декоратор представления API: только GET, gzip, чтение из реплики.
+
+    С scopes_func ответ поддерживает условные запросы (conditional_page).
+    """
+    def decorator(view):
+        if scopes_func is not None:
+            view = conditional_page(scopes_func)(view)
+        return wraps(view)(gzip_page(require_GET(read_replica(view))))
+    return decorator
+
+
+def _json(data, status=200):
+    return JsonResponse(
+        data,
+        status=status,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def _error(message, status=404):
+    return _json({'detail': message}, status=status)
+
+
+def _limit(request):
+    try:
+        return min(max(int(request.GET['limit']), 1), MAX_PAGE_SIZE)
+    except (KeyError, ValueError):
+        return PAGE_SIZE
+
+
+def _page(request, queryset, serialize, ordering=('-pub_date', '-pk')):
+    """Страница списка после курсора и курсоры соседних страниц."""
+    paginator = CursorPaginator(queryset, _limit(request), ordering)
+    page = paginator.get_page(request.GET.get('cursor'))
+    return _json({
+        'results': [serialize(obj) for obj in page],
+        'next': paginator.next_cursor,
+        'previous': paginator.previous_cursor,
+    })
+
+
+@api_view(index_scopes)
+def post_list(request):
+    """Все посты, новые первыми."""
+    return _page(request, for_feed(Post.objects.all()), serialize_post)
+
+
+@api_view(post_scopes)
+def post_detail(request, post_id):
+    """Пост; can_edit - то же правило, что у post_edit."""
+    post = for_feed(Post.objects.filter(pk=post_id)).first()
+    if post is None:
+        return _error('Пост не найден')
+    return _json({
+        **serialize_post(post),
+        'can_edit': post.author_id == request.user.pk,
+    })
+
+
+@api_view(post_scopes)
+def post_comments(request, post_id):
+    """Комментарии поста, старые первыми."""
+    if not Post.objects.filter(pk=post_id).exists():
+        return _error('Пост не найден')
+    comments = for_comments(Comment.objects.filter(post_id=post_id))
+    return _page(request, comments, serialize_comment, COMMENT_ORDERING)
+
+
+@api_view(groups_scopes)
+def group_list(request):
+    """Группы в порядке создания."""
+    return _page(
+        request, Group.objects.order_by('pk'), serialize_group, ('pk',)
+    )
+
+
+@api_view(group_scopes)
+def group_detail(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return _error('Группа не найдена')
+    return _json(serialize_group(group))
+
+
+@api_view(group_scopes)
+def group_posts(request, slug):
+    """Посты группы, новые первыми."""
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return _error('Группа не найдена')
+    return _page(request, for_feed(group.posts.all()), serialize_post)
+
+
+@api_view(profile_scopes)
+def profile(request, username):
+    """Автор, его счётчики и подписан ли на него текущий пользователь."""
+    author = (
+        User.objects.select_related('stats').filter(username=username).first()
+    )
+    if author is None:
+        return _error('Пользователь не найден')
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author=author
+    ).exists()
+    return _json(serialize_profile(author, get_stats(author), following))
+
+
+@api_view(profile_scopes)
+def profile_posts(request, username):
+    """Посты автора, новые первыми."""
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return _error('Пользователь не найден')
+    return _page(request, for_feed(author.posts.all()), serialize_post)
+
+
+@api_view()
+def follow_feed(request):
+    """Лента подписок; как и follow_index, только для авторизованных."""
+    if not request.user.is_authenticated:
+        return _error('Требуется авторизация', status=401)
+    return _page(
+        request, for_feed(get_timeline(request.user)), serialize_post,
+        TIMELINE_ORDERING,
+    )
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        # Настройка соединений с базой
+        from . import db  # noqa: F401
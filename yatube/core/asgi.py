@@ -0,0 +1,181 @@
+"""Запуск WSGI-приложения Django под ASGI-сервером.
+
+В Django 2.2 нет ни ASGI-обработчика, ни асинхронных представлений,
+поэтому адаптер выполняет каждый запрос - вызов приложения, чтение
+ответа и его закрытие - в потоке из ограниченного пула. Ожидание тела
+запроса пул не занимает. Части ответа поток складывает в очередь, а
+клиенту их отправляет событийный цикл, так что поток освобождается, не
+дожидаясь медленного клиента. Ждать клиента он будет только на длинном
+потоковом ответе: очередь держит не больше RESPONSE_BUFFER_CHUNKS
+неотправленных частей.
+"""
+import asyncio
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Тело запроса до этого размера держится в памяти, больше - во временном
+# файле
+BODY_MEMORY_SIZE: int = 2 * 1024 * 1024
+# Сколько неотправленных клиенту сообщений ответа может ждать в очереди
+RESPONSE_BUFFER_CHUNKS: int = 16
+
+
+def build_environ(scope, body):
+    """Окружение WSGI для HTTP-запроса ASGI."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # Пути WSGI - байты UTF-8, представленные строкой latin-1
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        value = value.decode('latin-1')
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+class WsgiToAsgi:
+    """ASGI-приложение поверх WSGI-приложения и пула потоков."""
+
+    def __init__(self, wsgi_application, max_workers=10):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемый тип запроса {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        body = tempfile.SpooledTemporaryFile(max_size=BODY_MEMORY_SIZE)
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body', False):
+                    break
+            body.seek(0)
+            await self.relay(build_environ(scope, body), send)
+        finally:
+            body.close()
+
+    async def relay(self, environ, send):
+        """Отправляет клиенту сообщения, которые поток пула кладёт в очередь.
+
+        Конец ответа - None в очереди. Если отправка не удалась, поток
+        прекращает чтение ответа и закрывает его.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        window = threading.Semaphore(RESPONSE_BUFFER_CHUNKS)
+        aborted = threading.Event()
+
+        def emit(message):
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+
+        future = loop.run_in_executor(
+            self.executor, self.respond, environ, emit, window, aborted
+        )
+        try:
+            message = await queue.get()
+            while message is not None:
+                await send(message)
+                window.release()
+                message = await queue.get()
+        except BaseException:
+            aborted.set()
+            window.release()
+            raise
+        finally:
+            await future
+
+    def respond(self, environ, emit, window, aborted):
+        """Обрабатывает запрос в потоке пула, передавая ответ в очередь.
+
+        Поток ждёт, только если в очереди RESPONSE_BUFFER_CHUNKS
+        неотправленных сообщений.
+        """
+        def deliver(message):
+            window.acquire()
+            if aborted.is_set():
+                return False
+            emit(message)
+            return True
+
+        try:
+            self.run_application(environ, deliver)
+        finally:
+            emit(None)
+
+    def run_application(self, environ, deliver):
+        """Вызывает приложение и передаёт ответ в deliver."""
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [{
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [
+                    (name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers
+                ],
+            }]
+
+        response = self.wsgi_application(environ, start_response)
+        try:
+            for chunk in response:
+                if started and not deliver(started.pop()):
+                    return
+                if chunk and not deliver({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                }):
+                    return
+            if started and not deliver(started.pop()):
+                return
+            deliver({'type': 'http.response.body', 'body': b''})
+        finally:
+            # Django отправляет request_finished и закрывает соединения
+            # с базой этого же потока
+            close = getattr(response, 'close', None)
+            if close is not None:
+                close()
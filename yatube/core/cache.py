@@ -0,0 +1,79 @@
+"""Версионированные ключи кэша.
+
+Каждая область (scope) - например 'posts' или 'group:1' - имеет счётчик
+поколений. Ключи фрагментов включают текущее поколение, поэтому изменение
+данных инвалидирует кэш увеличением счётчика, а не удалением фрагментов:
+устаревшие фрагменты просто перестают запрашиваться и вытесняются сами.
+
+Поколение - время последнего изменения области в наносекундах, поэтому
+оно годится и как Last-Modified для условных запросов.
+
+Область SITE_SCOPE входит в каждое поколение: её сброс инвалидирует все
+страницы разом (например, после массовой загрузки в обход сигналов), не
+трогая остальные записи кэша - сессии и пользователей.
+
+Счётчики должны лежать в общем для всех процессов кэше. С кэшем процесса
+(LocMemCache) они живут GENERATION_TIMEOUT секунд: тогда процесс, не
+видевший сброса, начинает новое поколение не позже этого срока. Срок
+не короче жизни кэшированных под поколением фрагментов, иначе они и
+валидаторы условных запросов обновлялись бы без изменения данных.
+"""
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+KEY_PREFIX = 'generation'
+SITE_SCOPE = 'site'
+
+
+def _key(scope):
+    return f'{KEY_PREFIX}:{scope}'
+
+
+def _initial():
+    # Начальное значение из времени: после вытеснения счётчика
+    # новое поколение не совпадёт ни с одним из прежних
+    return time.time_ns()
+
+
+def _get_many(scopes):
+    keys = [_key(scope) for scope in (SITE_SCOPE, *scopes)]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, _initial(), settings.GENERATION_TIMEOUT)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def get_generation(*scopes):
+    """Возвращает строку с текущими поколениями областей."""
+    return '-'.join(str(value) for value in _get_many(scopes))
+
+
+def get_last_modified(*scopes):
+    """Время последнего изменения любой из областей."""
+    return datetime.fromtimestamp(
+        max(_get_many(scopes)) / 10 ** 9, tz=timezone.utc
+    )
+
+
+def bump_generation(*scopes):
+    """Начинает новое поколение для каждой области.
+
+    Атомарный incr гарантирует рост счётчика при гонках, а шаг
+    подтягивает его значение к текущему времени.
+    """
+    for scope in scopes:
+        key = _key(scope)
+        current = cache.get(key)
+        if current is not None:
+            try:
+                cache.incr(key, max(1, _initial() - current))
+                continue
+            except ValueError:
+                # Счётчик вытеснили между чтением и incr
+                pass
+        cache.set(key, _initial(), settings.GENERATION_TIMEOUT)
@@ -0,0 +1,20 @@
+"""Настройка соединений с SQLite.
+
+PRAGMA из настройки SQLITE_PRAGMAS выполняются при каждом новом
+соединении: большинство из них действуют только на соединение.
+В режиме WAL читатели не ждут пишущую транзакцию, а фиксация
+с synchronous=NORMAL не вызывает fsync на каждую запись.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Применяет SQLITE_PRAGMAS к новому соединению SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        # Курсор Django не нужен: PRAGMA не должны попадать в замеры
+        connection.connection.execute(f'PRAGMA {name} = {value}')
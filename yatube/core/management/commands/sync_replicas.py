@@ -0,0 +1,34 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы реплик - '
+        'для проверки чтения из реплик локально'
+    )
+
+    def handle(self, *args, **options):
+        primary = connections['default']
+        if primary.vendor != 'sqlite':
+            raise CommandError(
+                'Реплики других СУБД обновляются их собственной репликацией'
+            )
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('В DATABASES не описано ни одной реплики')
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            replica = connections[alias]
+            if replica.vendor != 'sqlite':
+                raise CommandError(f'{alias}: реплика не SQLite')
+            replica.close()
+            target = sqlite3.connect(replica.settings_dict['NAME'])
+            try:
+                # Онлайн-копия: запись в основную базу не останавливается
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f'{alias}: скопирована'))
@@ -0,0 +1,137 @@
+"""Курсорная (keyset) пагинация."""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+# Границы целых, которые помещаются в INTEGER SQLite и BIGINT
+MIN_INTEGER = -2 ** 63
+MAX_INTEGER = 2 ** 63 - 1
+
+
+class CursorPaginator(Paginator):
+    """Паджинатор по ключу сортировки без COUNT(*) и OFFSET.
+
+    Страница выбирается условием WHERE относительно курсора - непрозрачной
+    строки с ключом крайней записи соседней страницы, поэтому любая страница
+    стоит одинаково. Все поля ordering должны иметь одно направление
+    сортировки, последнее поле должно быть уникальным (обычно pk). Полем
+    может быть и аннотация queryset.
+
+    Члены Paginator, которые считают COUNT(*) или выбирают страницу по
+    номеру через OFFSET, запрещены: страница берётся только get_page.
+    Номера у страницы нет (None), а её методы, зависящие от числа
+    страниц, тоже вызывают NotImplementedError - соседние страницы
+    адресуются next_cursor и previous_cursor.
+    """
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-pk')):
+        super().__init__(object_list, per_page)
+        self.ordering = tuple(ordering)
+        self.descending = self.ordering[0].startswith('-')
+        self.fields = tuple(field.lstrip('-') for field in self.ordering)
+        self.cursor = None
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def _no_offsets(self, *args, **kwargs):
+        raise NotImplementedError(
+            'CursorPaginator не считает страницы, используйте get_page'
+        )
+
+    count = num_pages = page_range = property(_no_offsets)
+    page = validate_number = _no_offsets
+
+    def _field(self, name):
+        """Поле модели или аннотации, к типу которого приводится курсор."""
+        annotations = self.object_list.query.annotations
+        if name in annotations:
+            return annotations[name].output_field
+        meta = self.object_list.model._meta
+        return meta.pk if name == 'pk' else meta.get_field(name)
+
+    def encode_cursor(self, obj, reverse=False):
+        """Упаковывает ключ записи в непрозрачную строку."""
+        position = [getattr(obj, field) for field in self.fields]
+        data = json.dumps({'p': position, 'r': reverse}, default=str)
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        """Распаковывает курсор; для некорректного возвращает None."""
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            position, reverse = data['p'], bool(data['r'])
+        except (
+            AttributeError, TypeError, KeyError,
+            ValueError, binascii.Error,
+        ):
+            return None
+        if not isinstance(position, list) or (
+            len(position) != len(self.fields)
+        ):
+            return None
+        # Курсор приходит от клиента: значения приводятся к типам полей
+        try:
+            position = [
+                self._field(name).to_python(value)
+                for name, value in zip(self.fields, position)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            return None
+        if None in position or any(
+            isinstance(value, int)
+            and not MIN_INTEGER <= value <= MAX_INTEGER
+            for value in position
+        ):
+            # Слишком большое целое база не примет
+            return None
+        return position, reverse
+
+    def _after(self, position, reverse):
+        """Условие "строго после позиции" в порядке обхода."""
+        lookup = 'lt' if self.descending != reverse else 'gt'
+        condition = Q()
+        for index, field in enumerate(self.fields):
+            equal = {
+                name: value
+                for name, value in zip(self.fields[:index], position)
+            }
+            condition |= Q(
+                **equal, **{f'{field}__{lookup}': position[index]}
+            )
+        return condition
+
+    def get_page(self, cursor):
+        """Возвращает страницу, следующую за курсором.
+
+        Некорректный или пустой курсор означает первую страницу.
+        """
+        decoded = self.decode_cursor(cursor) if cursor else None
+        queryset = self.object_list
+        reverse = False
+        if decoded is not None:
+            position, reverse = decoded
+            queryset = queryset.filter(self._after(position, reverse))
+            self.cursor = cursor
+        if reverse:
+            ordering = [
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in self.ordering
+            ]
+        else:
+            ordering = self.ordering
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+        if rows:
+            if has_more or reverse:
+                self.next_cursor = self.encode_cursor(rows[-1])
+            if decoded is not None and (has_more or not reverse):
+                self.previous_cursor = self.encode_cursor(
+                    rows[0], reverse=True
+                )
+        return self._get_page(rows, None, self)
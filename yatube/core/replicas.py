@@ -0,0 +1,115 @@
+"""Маршрутизация запросов между основной базой и репликами для чтения.
+
+Запись всегда идёт в основную базу default. Чтение уходит в реплику
+из настройки DATABASE_REPLICAS только внутри представлений, помеченных
+декоратором read_replica, - лент и страниц постов. Реплика выбирается
+одна на запрос, чтобы все его выборки видели одно состояние данных.
+
+Реплика может отставать, поэтому после записи браузер пользователя
+на REPLICA_PIN_SECONDS закрепляется за основной базой (cookie ставит
+PrimaryPinMiddleware): автор сразу видит свой пост или комментарий.
+Записью считается выполненный в основной базе INSERT, UPDATE или
+DELETE, а не выбор базы для записи: select_for_update и get_or_create
+без создания не закрепляют.
+Страница, данные которой менялись за последние REPLICA_LAG_SECONDS,
+тоже читается из основной базы (read_primary, posts.conditional):
+иначе кэш сохранил бы отрисованные из реплики старые данные под новым
+поколением.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'primary_until'
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_state = threading.local()
+
+
+@contextmanager
+def replica_reads():
+    """Направляет чтение в одну из реплик, если пользователь не закреплён."""
+    previous = getattr(_state, 'replica', None)
+    replicas = settings.DATABASE_REPLICAS
+    if replicas and not getattr(_state, 'pinned', False):
+        _state.replica = random.choice(replicas)
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+def read_primary():
+    """Остаток запроса читает из основной базы."""
+    _state.replica = None
+
+
+def _track_writes(execute, sql, params, many, context):
+    if sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+        _state.wrote = True
+    return execute(sql, params, many, context)
+
+
+def read_replica(view):
+    """Декоратор представления, которое может читать из реплики."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with replica_reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Роутер: чтение - в выбранную для запроса реплику, запись - в default.
+
+    Реплики - копии основной базы, миграции к ним не применяются.
+    """
+
+    def db_for_read(self, model, **hints):
+        return getattr(_state, 'replica', None) or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class PrimaryPinMiddleware:
+    """Закрепляет пользователя за основной базой после его записи."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            until = 0
+        _state.pinned = until > time.time()
+        _state.wrote = False
+        try:
+            with connections[DEFAULT_DB_ALIAS].execute_wrapper(
+                _track_writes
+            ):
+                response = self.get_response(request)
+        finally:
+            _state.pinned = False
+        if _state.wrote and settings.DATABASE_REPLICAS:
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE,
+                str(time.time() + seconds),
+                max_age=seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -1,4 +1,30 @@
-from django.test import TestCase
+import asyncio
+import os
+import re
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import replicas, timing
+from core.cache import bump_generation, get_generation
+from core.asgi import RESPONSE_BUFFER_CHUNKS, WsgiToAsgi
+from posts.models import Post
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
@@ -7,3 +33,359 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class GenerationTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_changes_generation(self):
+        """Сброс меняет поколение только своей области."""
+        first, other = get_generation('first'), get_generation('other')
+        bump_generation('first')
+        self.assertNotEqual(get_generation('first'), first)
+        self.assertEqual(get_generation('other'), other)
+
+    @override_settings(GENERATION_TIMEOUT=60)
+    def test_generation_expires_in_process_cache(self):
+        """Без общего кэша поколение начинается заново через срок."""
+        generation = get_generation('scope')
+        self.assertEqual(get_generation('scope'), generation)
+        later = time.time() + 61
+        with mock.patch('time.time', return_value=later):
+            self.assertNotEqual(get_generation('scope'), generation)
+
+    def test_generation_outlives_fragments(self):
+        """Поколение в кэше процесса живёт не меньше фрагментов страниц."""
+        if settings.GENERATION_TIMEOUT is None:
+            return
+        for name in ('index', 'group_list', 'profile'):
+            path = os.path.join(
+                settings.BASE_DIR, 'templates', 'posts', f'{name}.html'
+            )
+            with open(path, encoding='utf-8') as template:
+                timeouts = re.findall(r'{% cache (\d+) ', template.read())
+            with self.subTest(template=name):
+                self.assertTrue(timeouts)
+                for timeout in timeouts:
+                    self.assertLessEqual(
+                        int(timeout), settings.GENERATION_TIMEOUT
+                    )
+
+
+class ServerTimingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        timing._samples.clear()
+
+    def parse(self, response):
+        """Метрики заголовка Server-Timing: {имя: параметры}."""
+        metrics = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, *params = metric.split(';')
+            metrics[name] = ';'.join(params)
+        return metrics
+
+    def test_server_timing_header(self):
+        """Заголовок Server-Timing отражает запросы, шаблоны и кэш."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        metrics = self.parse(response)
+        self.assertEqual(
+            metrics['db'].split(';')[0], f'desc="{len(queries)} queries"'
+        )
+        self.assertGreater(
+            float(re.search(r'dur=([\d.]+)', metrics['tpl']).group(1)), 0
+        )
+        self.assertIn('total', metrics)
+        # Повторно фрагменты ленты берутся из кэша
+        response = self.client.get(reverse('posts:index'))
+        hits = re.search(r'(\d+) hits', self.parse(response)['cache'])
+        self.assertGreater(int(hits.group(1)), 0)
+
+    def test_all_databases_timed(self):
+        """Учитываются запросы ко всем базам, а не только к default."""
+        replica = DatabaseWrapper(
+            {**connection.settings_dict, 'NAME': ':memory:'}, alias='replica'
+        )
+        self.addCleanup(replica.close)
+
+        def view(request):
+            with replica.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return HttpResponse()
+
+        databases = {'default': connection, 'replica': replica}
+        with mock.patch.object(timing, 'connections', databases):
+            response = timing.ServerTimingMiddleware(view)(None)
+        self.assertEqual(
+            self.parse(response)['db'].split(';')[0], 'desc="1 queries"'
+        )
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+    def test_samples_page(self):
+        """Сохранённые замеры видны только персоналу."""
+        self.client.get(reverse('about:author'))
+        url = reverse('request_timings')
+        response = self.client.get(url)
+        self.assertRedirects(
+            response, f"{reverse('admin:login')}?next={url}"
+        )
+        admin = User.objects.create_user(username='TestStaff', is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.get(url)
+        self.assertContains(response, reverse('about:author'))
+
+
+class SQLitePragmasTest(SimpleTestCase):
+    """Соединения с файловой базой SQLite, как в продакшене."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'test.sqlite3')
+
+    def connect(self):
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict, 'NAME': self.path}, alias='pragmas'
+        )
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper.connection
+
+    def test_pragmas_applied(self):
+        """Новое соединение получает PRAGMA из настроек."""
+        db = self.connect()
+        self.assertEqual(
+            db.execute('PRAGMA journal_mode').fetchone()[0], 'wal'
+        )
+        # 1 - NORMAL
+        self.assertEqual(db.execute('PRAGMA synchronous').fetchone()[0], 1)
+        self.assertEqual(
+            db.execute('PRAGMA busy_timeout').fetchone()[0], 5000
+        )
+
+    def test_readers_not_blocked_by_writer(self):
+        """Чтение не ждёт пишущую транзакцию, пока она не завершится."""
+        writer = self.connect()
+        writer.execute('CREATE TABLE note (text TEXT)')
+        writer.execute("INSERT INTO note VALUES ('первая')")
+        reader = self.connect()
+        # Без ожидания блокировки: заблокированное чтение сразу упадёт
+        reader.execute('PRAGMA busy_timeout = 0')
+        writer.execute('BEGIN EXCLUSIVE')
+        writer.execute("INSERT INTO note VALUES ('вторая')")
+        self.assertEqual(
+            reader.execute('SELECT COUNT(*) FROM note').fetchone()[0], 1
+        )
+        writer.execute('COMMIT')
+        self.assertEqual(
+            reader.execute('SELECT COUNT(*) FROM note').fetchone()[0], 2
+        )
+
+
+# Реплика - та же тестовая база: проверяется выбор, а не копирование.
+# Отставание реплик учитывается только в test_recent_change_read_from_primary
+@override_settings(DATABASE_REPLICAS=['default'], REPLICA_LAG_SECONDS=0)
+class ReplicaRoutingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.author)
+        # force_login записал сессию - закрепление сбрасываем
+        self.client.cookies.pop(replicas.PIN_COOKIE, None)
+
+    def replica_queries(self, method, url, data=None):
+        """Число запросов, выполненных в рамках чтения из реплики."""
+        routed = []
+
+        def record(execute, sql, params, many, context):
+            routed.append(getattr(replicas._state, 'replica', None))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            getattr(self.client, method)(url, data)
+        return sum(alias is not None for alias in routed)
+
+    def test_router(self):
+        """Чтение в реплику только в рамках replica_reads, запись - нет."""
+        router = replicas.ReplicaRouter()
+        self.assertEqual(router.db_for_read(Post), 'default')
+        with override_settings(DATABASE_REPLICAS=['replica']):
+            with replicas.replica_reads():
+                self.assertEqual(router.db_for_read(Post), 'replica')
+                self.assertEqual(router.db_for_write(Post), 'default')
+            self.assertFalse(router.allow_migrate('replica', 'posts'))
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_feed_pages_read_from_replica(self):
+        """Ленты читаются из реплики, запись - из основной базы."""
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'TestAuthor'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:follow_index'),
+        ):
+            with self.subTest(url=url):
+                self.assertGreater(self.replica_queries('get', url), 0)
+        url = reverse('posts:post_create')
+        self.assertEqual(
+            self.replica_queries('post', url, {'text': 'Новый пост'}), 0
+        )
+
+    @override_settings(REPLICA_LAG_SECONDS=5)
+    def test_recent_change_read_from_primary(self):
+        """Недавно изменённая страница читается из основной базы."""
+        # Сессия и пользователь читаются до выбора базы для страницы
+        self.client.logout()
+        url = reverse('posts:index')
+        bump_generation('posts')
+        self.assertEqual(self.replica_queries('get', url), 0)
+        later = time.time() + 6
+        with mock.patch('time.time', return_value=later):
+            self.assertGreater(self.replica_queries('get', url), 0)
+
+    def test_locking_read_does_not_pin(self):
+        """Чтение с блокировкой строк без записи не закрепляет."""
+        def locking_view(request):
+            with transaction.atomic():
+                Post.objects.select_for_update().get(pk=self.post.pk)
+                Post.objects.get_or_create(
+                    pk=self.post.pk, defaults={'author': self.author}
+                )
+            return HttpResponse()
+
+        def writing_view(request):
+            Post.objects.filter(pk=self.post.pk).update(text='Изменён')
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        response = replicas.PrimaryPinMiddleware(locking_view)(request)
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+        response = replicas.PrimaryPinMiddleware(writing_view)(request)
+        self.assertIn(replicas.PIN_COOKIE, response.cookies)
+
+    def test_pinned_after_write(self):
+        """После записи пользователь читает из основной базы."""
+        response = self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Комментарий'},
+        )
+        self.assertIn(replicas.PIN_COOKIE, response.cookies)
+        self.assertEqual(
+            self.replica_queries('get', reverse('posts:index')), 0
+        )
+        self.client.cookies.pop(replicas.PIN_COOKIE)
+        self.assertGreater(
+            self.replica_queries('get', reverse('posts:index')), 0
+        )
+
+
+class WsgiToAsgiTest(SimpleTestCase):
+    def call(self, application, scope, body_parts=(b'',)):
+        """Ответ ASGI-приложения: список отправленных сообщений."""
+        messages = [
+            {'type': 'http.request', 'body': part, 'more_body': True}
+            for part in body_parts
+        ]
+        messages[-1]['more_body'] = False
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asgi = WsgiToAsgi(application, max_workers=2)
+        self.addCleanup(asgi.executor.shutdown)
+        asyncio.run(asgi({'type': 'http', **scope}, receive, send))
+        return sent
+
+    def test_environ_and_streaming(self):
+        """Запрос переводится в окружение WSGI, ответ отдаётся частями."""
+        def echo(environ, start_response):
+            start_response('201 Created', [('X-Path', 'ok')])
+            yield environ['PATH_INFO'].encode('latin-1')
+            yield environ['QUERY_STRING'].encode()
+            yield environ['HTTP_X_TOKEN'].encode()
+            yield environ['wsgi.input'].read()
+
+        sent = self.call(echo, {
+            'method': 'POST',
+            'path': '/пост/',
+            'query_string': b'a=1',
+            'headers': [(b'x-token', b'abc')],
+        }, body_parts=(b'part1-', b'part2'))
+        self.assertEqual(sent[0]['status'], 201)
+        self.assertIn((b'x-path', b'ok'), sent[0]['headers'])
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertEqual(body, '/пост/'.encode() + b'a=1abcpart1-part2')
+        self.assertFalse(sent[-1].get('more_body', False))
+
+    def test_slow_client_does_not_hold_thread(self):
+        """Поток пула закрывает ответ, не дожидаясь отправки клиенту."""
+        closed = threading.Event()
+        delivered_after_close = []
+
+        def application(environ, start_response):
+            start_response('200 OK', [])
+            try:
+                yield b'ok'
+            finally:
+                closed.set()
+
+        async def send(message):
+            loop = asyncio.get_running_loop()
+            delivered_after_close.append(
+                await loop.run_in_executor(None, closed.wait, 5)
+            )
+
+        asgi = WsgiToAsgi(application, max_workers=1)
+        self.addCleanup(asgi.executor.shutdown)
+        asyncio.run(asgi(
+            {'type': 'http', 'method': 'GET', 'path': '/'},
+            mock.AsyncMock(return_value={'type': 'http.request'}),
+            send,
+        ))
+        self.assertEqual(delivered_after_close, [True, True, True])
+
+    def test_disconnect_stops_streaming(self):
+        """Если клиент отключился, длинный ответ не дочитывается."""
+        produced = []
+
+        def application(environ, start_response):
+            start_response('200 OK', [])
+            for number in range(RESPONSE_BUFFER_CHUNKS * 4):
+                produced.append(number)
+                yield b'chunk'
+
+        async def send(message):
+            if message['type'] == 'http.response.body':
+                raise OSError('Клиент отключился')
+
+        asgi = WsgiToAsgi(application, max_workers=1)
+        self.addCleanup(asgi.executor.shutdown)
+        with self.assertRaises(OSError):
+            asyncio.run(asgi(
+                {'type': 'http', 'method': 'GET', 'path': '/'},
+                mock.AsyncMock(return_value={'type': 'http.request'}),
+                send,
+            ))
+        self.assertLess(len(produced), RESPONSE_BUFFER_CHUNKS * 2)
+
+    def test_django_page(self):
+        """Страница Django под ASGI та же, что у тестового клиента."""
+        sent = self.call(get_wsgi_application(), {
+            'method': 'GET',
+            'path': reverse('about:author'),
+            'headers': [(b'host', b'testserver')],
+        })
+        self.assertEqual(sent[0]['status'], 200)
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertEqual(
+            body, self.client.get(reverse('about:author')).content
+        )
@@ -0,0 +1,169 @@
+"""Замеры запроса для заголовка Server-Timing.
+
+Middleware собирает за время запроса число и время SQL-запросов, время
+отрисовки шаблонов, попадания и промахи кэша и общее время обработки,
+и отдаёт их в заголовке Server-Timing. Доля запросов
+SERVER_TIMING_SAMPLE_RATE сохраняется в кольцевой буфер последних
+SERVER_TIMING_SAMPLES замеров, который показывает страница админки.
+
+Замеры копятся в объекте текущего потока. Шаблоны и кэш
+инструментируются подклассами штатных бэкендов (см. TEMPLATES и CACHES),
+SQL - обёрткой execute_wrapper каждого подключения, включая реплики.
+"""
+import random
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import MemcachedCache
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils import timezone
+
+_local = threading.local()
+_samples = deque(maxlen=getattr(settings, 'SERVER_TIMING_SAMPLES', 200))
+_MISSING = object()
+
+
+class RequestTimings:
+    """Замеры одного запроса; время - в секундах."""
+    __slots__ = (
+        'queries', 'db_time', 'template_time', 'template_depth',
+        'cache_hits', 'cache_misses',
+    )
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def current():
+    """Замеры текущего запроса или None вне middleware."""
+    return getattr(_local, 'timings', None)
+
+
+def _time_query(execute, sql, params, many, context):
+    timings = current()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if timings is not None:
+            timings.queries += 1
+            timings.db_time += time.perf_counter() - started
+
+
+class TimedTemplate(Template):
+    """Шаблон, учитывающий время отрисовки.
+
+    Вложенные отрисовки (например, статьи внутри ленты) уже входят во время
+    внешней, поэтому учитывается только шаблон верхнего уровня.
+    """
+    def render(self, context=None, request=None):
+        timings = current()
+        if timings is None:
+            return super().render(context, request)
+        timings.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template_depth -= 1
+            if not timings.template_depth:
+                timings.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Штатный бэкенд шаблонов Django с замером отрисовки."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+class TimedCacheMixin:
+    """Считает попадания и промахи чтений кэша."""
+
+    def _count(self, hits, misses):
+        timings = current()
+        if timings is not None:
+            timings.cache_hits += hits
+            timings.cache_misses += misses
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        self._count(value is not _MISSING, value is _MISSING)
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = super().get_many(keys, version)
+        self._count(len(values), len(keys) - len(values))
+        return values
+
+
+class TimedLocMemCache(TimedCacheMixin, LocMemCache):
+    """LocMemCache с подсчётом попаданий."""
+
+
+class TimedMemcachedCache(TimedCacheMixin, MemcachedCache):
+    """MemcachedCache с подсчётом попаданий."""
+
+
+def get_samples():
+    """Сохранённые замеры, новые - первыми."""
+    return list(reversed(_samples))
+
+
+class ServerTimingMiddleware:
+    """Добавляет заголовок Server-Timing и сохраняет выборку замеров."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 0)
+
+    def __call__(self, request):
+        timings = _local.timings = RequestTimings()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(_time_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.timings = None
+        total = time.perf_counter() - started
+        response['Server-Timing'] = ', '.join((
+            f'db;desc="{timings.queries} queries";'
+            f'dur={timings.db_time * 1000:.1f}',
+            f'tpl;dur={timings.template_time * 1000:.1f}',
+            f'cache;desc="{timings.cache_hits} hits, '
+            f'{timings.cache_misses} misses"',
+            f'total;dur={total * 1000:.1f}',
+        ))
+        if self.sample_rate and random.random() < self.sample_rate:
+            _samples.append({
+                'time': timezone.now(),
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'queries': timings.queries,
+                'db_ms': timings.db_time * 1000,
+                'template_ms': timings.template_time * 1000,
+                'cache_hits': timings.cache_hits,
+                'cache_misses': timings.cache_misses,
+                'total_ms': total * 1000,
+            })
+        return response
@@ -1,7 +1,10 @@
 from http import HTTPStatus
 
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render
 
+from .timing import get_samples
+
 
 def page_not_found(request, exception):
     return render(
@@ -28,3 +31,13 @@ def server_error(request):
     return render(
         request, 'core/500.html', status=HTTPStatus.INTERNAL_SERVER_ERROR
     )
+
+
+@staff_member_required
+def request_timings(request):
+    """Последние сохранённые замеры запросов."""
+    return render(
+        request,
+        'core/request_timings.html',
+        {'samples': get_samples(), 'title': 'Замеры запросов'},
+    )
@@ -1,10 +1,13 @@
 """Интерфейс администратора."""
 from django.contrib import admin
 
+from search.admin import IndexSearchMixin
+from search.backends import COMMENT, POST
+
 from .models import Comment, Follow, Post, Group
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(IndexSearchMixin, admin.ModelAdmin):
     """Интерфейс постов."""
     list_display = (
         'pk',
@@ -16,6 +19,7 @@ class PostAdmin(admin.ModelAdmin):
     )
     list_editable = ('group',)
     search_fields = ('text',)
+    search_kind = POST
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
@@ -30,7 +34,7 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(IndexSearchMixin, admin.ModelAdmin):
     """Интерфейс комментариев."""
     list_display = (
         'pk',
@@ -39,6 +43,8 @@ class CommentAdmin(admin.ModelAdmin):
         'author',
         'text',
     )
+    search_fields = ('text',)
+    search_kind = COMMENT
     list_filter = ('created',)
     empty_value_display = '-пусто-'
 
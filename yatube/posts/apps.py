@@ -4,3 +4,7 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        # Подключаем обработчики сигналов
+        from . import signals  # noqa: F401
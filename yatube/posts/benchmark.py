@@ -0,0 +1,146 @@
+"""Замеры страниц приложения posts: запросы к БД, время и память.
+
+Каждый URL из posts.urls запрашивается несколько раз с пустым кэшем -
+так видны N+1 и медленные запросы, которые кэш фрагментов прячет.
+Результаты сравниваются с бюджетом из JSON-файла. Число запросов от
+машины не зависит и проверяется всегда; время и память - только по
+запросу (strict), на той же машине, где записан бюджет.
+"""
+import json
+import math
+import os
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Group
+from .urls import app_name, urlpatterns
+
+User = get_user_model()
+
+BUDGET_FILE = os.path.join(os.path.dirname(__file__), 'benchmark_budget.json')
+METRICS = ('queries', 'p50_ms', 'p95_ms', 'memory_kb')
+# Метрики, которые не зависят от машины
+PORTABLE_METRICS = ('queries',)
+# Управление транзакцией зависит от окружения (в тестах atomic -
+# точка сохранения), поэтому в число запросов не входит
+TRANSACTION_SQL = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+# Запас бюджета на время и память при его записи
+HEADROOM: float = 3.0
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[max(0, math.ceil(len(values) * percent / 100) - 1)]
+
+
+def _url_kwargs(viewer):
+    """Аргументы URL: самые наполненные группа, автор и пост зрителя.
+
+    На автора зритель не подписан, чтобы подписка и отписка
+    замерялись с записью в базу.
+    """
+    group = Group.objects.annotate(total=Count('posts')).latest('total')
+    author = (
+        User.objects.exclude(pk=viewer.pk)
+        .exclude(following__user=viewer)
+        .annotate(total=Count('posts')).latest('total')
+    )
+    post = viewer.posts.annotate(total=Count('comments')).latest('total')
+    return {
+        'slug': group.slug,
+        'username': author.username,
+        'post_id': post.pk,
+    }
+
+
+def choose_viewer():
+    """Зритель - пользователь с наибольшим числом подписок и постами."""
+    return (
+        User.objects.filter(posts__isnull=False)
+        .annotate(total=Count('follower', distinct=True))
+        .latest('total')
+    )
+
+
+def run(repeat=20, viewer=None):
+    """Замеряет каждый URL; возвращает {имя URL: {метрика: значение}}."""
+    viewer = viewer or choose_viewer()
+    client = Client()
+    client.force_login(viewer)
+    kwargs = _url_kwargs(viewer)
+    results = {}
+    for pattern in urlpatterns:
+        name = f'{app_name}:{pattern.name}'
+        url = reverse(name, kwargs={
+            key: kwargs[key] for key in pattern.pattern.converters
+        })
+        queries, timings = 0, []
+        for _ in range(repeat):
+            cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, sum(
+                not query['sql'].startswith(TRANSACTION_SQL)
+                for query in captured
+            ))
+        # Трассировка памяти замедляет запрос, поэтому отдельный прогон
+        cache.clear()
+        tracemalloc.start()
+        client.get(url)
+        memory = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+        results[name] = {
+            'queries': queries,
+            'p50_ms': round(_percentile(timings, 50), 2),
+            'p95_ms': round(_percentile(timings, 95), 2),
+            'memory_kb': memory,
+        }
+    return results
+
+
+def load_budget(path=BUDGET_FILE):
+    with open(path, encoding='utf-8') as budget_file:
+        return json.load(budget_file)
+
+
+def save_budget(results, path=BUDGET_FILE):
+    """Записывает бюджет: запросы - как измерены, остальное с запасом."""
+    budget = {
+        name: {
+            metric: (
+                value if metric == 'queries'
+                else math.ceil(value * HEADROOM)
+            )
+            for metric, value in metrics.items()
+        }
+        for name, metrics in sorted(results.items())
+    }
+    with open(path, 'w', encoding='utf-8') as budget_file:
+        json.dump(budget, budget_file, indent=2)
+        budget_file.write('\n')
+
+
+def check(results, budget, metrics=PORTABLE_METRICS):
+    """Список превышений бюджета в виде строк."""
+    failures = []
+    for name, measured in results.items():
+        for metric in metrics:
+            limit = budget.get(name, {}).get(metric)
+            if limit is None:
+                failures.append(f'{name}: нет бюджета для {metric}')
+            elif measured[metric] > limit:
+                failures.append(
+                    f'{name}: {metric} = {measured[metric]}, '
+                    f'бюджет {limit}'
+                )
+    return failures
@@ -0,0 +1,49 @@
+"""Помощники массовой загрузки данных в обход сигналов.
+
+bulk_create не отправляет post_save, поэтому после загрузки производные
+данные - счётчики, ленты подписок, поисковый индекс и поколения кэша -
+пересчитываются одним проходом rebuild_derived.
+"""
+from contextlib import contextmanager
+from itertools import islice
+
+from core.cache import SITE_SCOPE, bump_generation
+from search.indexing import rebuild as rebuild_search_index
+
+from . import stats, timeline
+
+BATCH_SIZE: int = 5000
+
+
+def batched(iterable, size=BATCH_SIZE):
+    """Разбивает поток объектов на списки не длиннее size."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def manual_dates(model, *field_names):
+    """Отключает auto_now_add у полей, чтобы сохранить заданные даты."""
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(fields, saved):
+            field.auto_now_add = value
+
+
+def rebuild_derived():
+    """Пересчитывает счётчики, ленты подписок, поисковый индекс и кэш."""
+    stats.reconcile()
+    timeline.rebuild()
+    rebuild_search_index()
+    # Поколения по авторам и группам сигналы не увеличивали. Сбрасываем
+    # все страницы разом, а не весь кэш: в нём лежат и сессии
+    bump_generation(SITE_SCOPE)
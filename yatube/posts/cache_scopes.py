@@ -0,0 +1,18 @@
+"""Области кэша (core.cache), в которых выводится пост.
+
+Их сбрасывают сигналы сохранения поста и фоновые задачи, которые
+меняют пост в обход save (варианты картинок).
+"""
+
+
+def post_cache_scopes(post):
+    """Области кэша, в которых отображается пост.
+
+    Для поста, перенесённого в другую группу, - и области прежней группы
+    (её запоминает обработчик post_init в posts.signals).
+    """
+    scopes = {'posts', f'author:{post.author_id}', f'post:{post.pk}'}
+    for group_id in (post.group_id, getattr(post, '_loaded_group_id', None)):
+        if group_id is not None:
+            scopes.add(f'group:{group_id}')
+    return scopes
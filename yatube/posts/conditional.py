@@ -0,0 +1,156 @@
+"""Условные GET-запросы (ETag и Last-Modified) для страниц постов.
+
+Валидаторы строятся из поколений кэша (core.cache), которые сигналы
+увеличивают при любом изменении постов, групп, комментариев и подписок.
+Поэтому на повторный запрос можно ответить 304, не выполняя основной
+запрос страницы и не отрисовывая шаблон.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.views.decorators.http import condition
+
+from core import replicas
+from core.cache import get_generation, get_last_modified
+
+from .models import Group, Post
+
+User = get_user_model()
+
+
+def index_scopes():
+    return ['posts', 'groups', 'users']
+
+
+def group_scopes(slug):
+    group_id = (
+        Group.objects.filter(slug=slug).values_list('pk', flat=True).first()
+    )
+    if group_id is None:
+        return None
+    return [f'group:{group_id}', 'users']
+
+
+def profile_scopes(username):
+    author_id = (
+        User.objects.filter(username=username)
+        .values_list('pk', flat=True).first()
+    )
+    if author_id is None:
+        return None
+    return [f'author:{author_id}', f'user:{author_id}', 'groups']
+
+
+def post_scopes(post_id):
+    author_id = (
+        Post.objects.filter(pk=post_id)
+        .values_list('author_id', flat=True).first()
+    )
+    if author_id is None:
+        return None
+    return [f'post:{post_id}', f'user:{author_id}', 'groups', 'users']
+
+
+def _read_primary_if_changed(scopes):
+    """Недавно изменённую страницу читаем из основной базы.
+
+    Реплика может ещё не содержать изменения, а отрисованная из неё
+    страница попала бы в кэш под новым поколением.
+    """
+    lag = settings.REPLICA_LAG_SECONDS
+    if not (settings.DATABASE_REPLICAS and lag):
+        return
+    if time.time() - get_last_modified(*scopes).timestamp() < lag:
+        replicas.read_primary()
+
+
+def conditional_page(scopes_func):
+    """Декоратор: отвечает 304, если области страницы не менялись.
+
+    Страница зависит от зрителя (шапка, кнопки), поэтому его данные входят
+    в ETag. Last-Modified отдаётся только анонимам: иначе после входа или
+    выхода браузер получил бы 304 на страницу другого пользователя.
+    """
+    def get_scopes(request, *args, **kwargs):
+        if not hasattr(request, '_page_scopes'):
+            scopes = scopes_func(*args, **kwargs)
+            if scopes is not None:
+                if request.user.is_authenticated:
+                    scopes.append(f'user:{request.user.pk}')
+                _read_primary_if_changed(scopes)
+            request._page_scopes = scopes
+        return request._page_scopes
+
+    def etag(request, *args, **kwargs):
+        scopes = get_scopes(request, *args, **kwargs)
+        if scopes is None:
+            return None
+        key = '|'.join((
+            get_generation(*scopes),
+            str(request.user.pk),
+            request.get_full_path(),
+        ))
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        scopes = get_scopes(request, *args, **kwargs)
+        if scopes is None or request.user.is_authenticated:
+            return None
+        return get_last_modified(*scopes)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def site_feed_scopes():
+    return ['posts', 'groups', 'users']
+
+
+def group_feed_scopes(slug):
+    return group_scopes(slug)
+
+
+def profile_feed_scopes(username):
+    scopes = profile_scopes(username)
+    return scopes and scopes[:3]
+
+
+def conditional_feed(scopes_func):
+    """Декоратор для лент RSS и Atom: 304 по ETag и If-Modified-Since.
+
+    Ленты одинаковы для всех читателей, поэтому Last-Modified отдаётся
+    всем, а зритель в ETag не входит. Параметры запроса ленты не
+    меняют, поэтому ETag строится по пути без них. Области ленты сохраняются
+    в request.feed_scopes - по ним представление версионирует кэш.
+    """
+    def get_scopes(request, *args, **kwargs):
+        if not hasattr(request, 'feed_scopes'):
+            request.feed_scopes = scopes_func(*args, **kwargs)
+        return request.feed_scopes
+
+    def etag(request, *args, **kwargs):
+        scopes = get_scopes(request, *args, **kwargs)
+        if scopes is None:
+            return None
+        key = '|'.join((get_generation(*scopes), request.path))
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        scopes = get_scopes(request, *args, **kwargs)
+        if scopes is None:
+            return None
+        return get_last_modified(*scopes)
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=etag, last_modified_func=last_modified
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            get_scopes(request, *args, **kwargs)
+            return conditional_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,59 @@
+"""Пул потоков для фоновых задач, которые запрос не ждёт.
+
+Сейчас через него нарезаются варианты картинок (posts.images). Очередь
+ограничена BACKGROUND_QUEUE_LIMIT: задача сверх предела отбрасывается,
+и её поставит заново следующий запрос, которому она нужна.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_WORKERS,
+                thread_name_prefix='background',
+            )
+        return _executor
+
+
+def submit(task, func, *args):
+    """Выполняет func(*args) в пуле потоков; задача task не дублируется.
+
+    При BACKGROUND_WORKERS = 0 функция выполняется сразу. Если в очереди
+    уже BACKGROUND_QUEUE_LIMIT задач, новая отбрасывается; возвращает,
+    принята ли задача.
+    """
+    with _lock:
+        if task in _pending:
+            return True
+        if len(_pending) >= settings.BACKGROUND_QUEUE_LIMIT:
+            logger.warning('Очередь фоновых задач полна, %s отброшена', task)
+            return False
+        _pending.add(task)
+
+    def run():
+        try:
+            func(*args)
+        except Exception:
+            logger.exception('Фоновая задача %s не выполнена', task)
+        finally:
+            with _lock:
+                _pending.discard(task)
+
+    if settings.BACKGROUND_WORKERS:
+        _get_executor().submit(run)
+    else:
+        run()
+    return True
@@ -0,0 +1,156 @@
+"""Потоковая выгрузка постов, комментариев, подписок и групп.
+
+Строки читаются из базы пачками (iterator с chunk_size) и сразу
+сериализуются, поэтому расход памяти не зависит от размера таблицы.
+Связанные объекты выгружаются естественными ключами - именем
+пользователя и слагом группы, - которые понимает import_posts.
+"""
+import csv
+import json
+import zlib
+
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Comment, Follow, Group, Post
+
+CHUNK_SIZE: int = 2000
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class Export:
+    """Описание выгрузки модели: столбцы и поля для фильтров."""
+
+    def __init__(self, model, columns, date_field=None, author_field=None):
+        self.model = model
+        # Столбец выгрузки -> путь к полю
+        self.columns = columns
+        self.date_field = date_field
+        self.author_field = author_field
+
+
+EXPORTS = {
+    'posts': Export(
+        Post,
+        {
+            'id': 'id',
+            'text': 'text',
+            'pub_date': 'pub_date',
+            'author': 'author__username',
+            'group': 'group__slug',
+            'image': 'image',
+        },
+        date_field='pub_date',
+        author_field='author',
+    ),
+    'comments': Export(
+        Comment,
+        {
+            'id': 'id',
+            'post': 'post_id',
+            'author': 'author__username',
+            'text': 'text',
+            'created': 'created',
+        },
+        date_field='created',
+        author_field='author',
+    ),
+    'follows': Export(
+        Follow,
+        {'user': 'user__username', 'author': 'author__username'},
+        author_field='author',
+    ),
+    'groups': Export(
+        Group,
+        {
+            'id': 'id',
+            'title': 'title',
+            'slug': 'slug',
+            'description': 'description',
+        },
+    ),
+}
+
+
+def parse_moment(value, end=False):
+    """Момент времени фильтра из даты или даты-времени ISO 8601.
+
+    Дата без времени означает начало дня, а при end=True - его конец.
+    Для некорректной строки - ValueError.
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Некорректная дата: {value}')
+        moment = datetime.combine(day, time.max if end else time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def get_rows(kind, since=None, until=None, author=None):
+    """Кортежи значений столбцов выгрузки kind по возрастанию pk.
+
+    since и until - моменты времени, включительно - фильтруют по дате
+    публикации, author - по имени автора; фильтры, которых у модели нет,
+    отбрасываются.
+    """
+    export = EXPORTS[kind]
+    queryset = export.model.objects.order_by('pk')
+    if export.date_field:
+        lookup = export.date_field
+        if since:
+            queryset = queryset.filter(**{f'{lookup}__gte': since})
+        if until:
+            queryset = queryset.filter(**{f'{lookup}__lte': until})
+    if export.author_field and author:
+        queryset = queryset.filter(
+            **{f'{export.author_field}__username': author}
+        )
+    return queryset.values_list(*export.columns.values()).iterator(
+        chunk_size=CHUNK_SIZE
+    )
+
+
+class _Line:
+    """Файлоподобный объект: csv.writer возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def serialize(kind, rows, export_format='jsonl'):
+    """Строки выгрузки в выбранном формате, по одной на объект."""
+    columns = list(EXPORTS[kind].columns)
+    if export_format == 'csv':
+        writer = csv.writer(_Line())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+        return
+    for row in rows:
+        yield json.dumps(
+            dict(zip(columns, row)), ensure_ascii=False, default=str
+        ) + '\n'
+
+
+def encode(lines, compress=False):
+    """Кодирует строки в UTF-8 и при необходимости сжимает gzip на лету."""
+    if not compress:
+        for line in lines:
+            yield line.encode()
+        return
+    # wbits=31 - формат gzip с заголовком и контрольной суммой
+    compressor = zlib.compressobj(wbits=31)
+    for line in lines:
+        chunk = compressor.compress(line.encode())
+        if chunk:
+            yield chunk
+    yield compressor.flush()
@@ -0,0 +1,30 @@
+"""Выборка постов для лент и комментариев для страницы поста.
+
+Статья ленты (includes/article.html) выводит текст, дату и картинку
+поста, имя автора и группу. Все ленты строят queryset через for_feed:
+автор и группа выбираются тем же запросом, что и посты, а столбцы,
+которые статья не показывает, не читаются. Поэтому число запросов
+страницы не зависит от числа постов на ней.
+"""
+# Поля, которые выводит статья и учитывает её версия в кэше
+ARTICLE_FIELDS = (
+    'text', 'pub_date', 'image', 'image_variants', 'author_id', 'group_id',
+    'author__username', 'author__first_name', 'author__last_name',
+    'group__slug', 'group__title',
+)
+
+
+def for_feed(queryset):
+    """Queryset постов, готовый к выводу статьями ленты."""
+    return queryset.select_related('author', 'group').only(*ARTICLE_FIELDS)
+
+
+# Поля, которые выводит список комментариев
+COMMENT_FIELDS = ('text', 'created', 'author__username')
+# Комментарии идут от старых к новым; pk различает одновременные
+COMMENT_ORDERING = ('created', 'pk')
+
+
+def for_comments(queryset):
+    """Queryset комментариев, готовый к выводу списком."""
+    return queryset.select_related('author').only(*COMMENT_FIELDS)
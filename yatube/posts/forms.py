@@ -1,5 +1,7 @@
-from django.forms import ModelForm
+from django.core.files.uploadedfile import UploadedFile
+from django.forms import ModelForm, ValidationError
 
+from . import uploads
 from .models import Comment, Post
 
 
@@ -10,6 +12,26 @@ class PostForm(ModelForm):
         # Поля модели, которые должны отображаться в веб-форме
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Файл, отклонённый при приёме, полю не передаём: ошибку с
+        # причиной добавит clean_image
+        self.rejected_image = self.files.get('image')
+        if isinstance(self.rejected_image, uploads.RejectedUpload):
+            self.files = self.files.copy()
+            del self.files['image']
+        else:
+            self.rejected_image = None
+
+    def clean_image(self):
+        """Новая картинка уменьшается и перекодируется без метаданных."""
+        if self.rejected_image is not None:
+            raise ValidationError(self.rejected_image.reason)
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            return uploads.normalize(image)
+        return image
+
 
 class CommentForm(ModelForm):
     """Форма для нового комментария, на основе модели Comment."""
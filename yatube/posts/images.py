@@ -0,0 +1,177 @@
+"""Адаптивные варианты картинок постов.
+
+После загрузки картинки фоновая задача (пул posts.executor) нарезает
+её в нескольких ширинах с кадром статьи 960x339 и делает крошечную
+размытую заглушку. Имена файлов и заглушка сохраняются в
+Post.image_variants, поэтому шаблон выводит srcset прямо из поста, без
+обращений к KV-store миниатюр. Формат - первый из IMAGE_VARIANT_FORMATS,
+который умеет сохранять установленный Pillow.
+
+Если нарезка не удалась, повтор откладывается с растущей паузой, а не
+ставится заново при каждом показе поста.
+"""
+import base64
+import io
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageFilter, ImageOps
+
+from core.cache import bump_generation
+
+from . import executor
+from .cache_scopes import post_cache_scopes
+from .models import Post
+
+# Ширины вариантов; кадр тот же, что у миниатюры статьи
+WIDTHS = (320, 640, 960)
+ASPECT = (960, 339)
+VARIANTS_DIR = 'variants'
+EXTENSIONS = {'AVIF': 'avif', 'WEBP': 'webp', 'JPEG': 'jpg'}
+QUALITY: int = 80
+PLACEHOLDER_WIDTH: int = 16
+# Пауза перед повтором неудачной нарезки: удваивается с каждой неудачей
+RETRY_DELAY: int = 60
+RETRY_MAX_DELAY: int = 60 * 60 * 6
+# CSS-класс плейсхолдера: фрагмент с ним не кэшируется
+PENDING_MARKER = 'thumbnail-pending'
+
+
+def variant_format():
+    """Лучший из IMAGE_VARIANT_FORMATS, доступный Pillow."""
+    Image.init()
+    for format_ in settings.IMAGE_VARIANT_FORMATS:
+        if format_ in Image.SAVE and format_ in EXTENSIONS:
+            return format_
+    return 'JPEG'
+
+
+def height(width):
+    return round(width * ASPECT[1] / ASPECT[0])
+
+
+def _encode(image, format_, quality=QUALITY):
+    buffer = io.BytesIO()
+    params = {'quality': quality}
+    if format_ == 'JPEG':
+        params.update(optimize=True, progressive=True)
+    image.save(buffer, format_, **params)
+    return buffer.getvalue()
+
+
+def build(name, storage=default_storage):
+    """Создаёт варианты картинки name; возвращает их описание.
+
+    Ширины больше исходной не создаются: браузер растянет картинку сам.
+    """
+    with storage.open(name) as file_:
+        source = ImageOps.exif_transpose(Image.open(file_))
+        source = source.convert('RGB')
+    format_ = variant_format()
+    stem = os.path.splitext(os.path.basename(name))[0]
+    widths = [width for width in WIDTHS if width <= source.width]
+    sources = []
+    for width in widths or WIDTHS[:1]:
+        image = ImageOps.fit(source, (width, height(width)), Image.LANCZOS)
+        saved = storage.save(
+            f'{VARIANTS_DIR}/{stem}-{width}.{EXTENSIONS[format_]}',
+            ContentFile(_encode(image, format_)),
+        )
+        sources.append([saved, width])
+    placeholder = ImageOps.fit(
+        source, (PLACEHOLDER_WIDTH, height(PLACEHOLDER_WIDTH))
+    ).filter(ImageFilter.GaussianBlur(1))
+    return {
+        'source': name,
+        'sources': sources,
+        'placeholder': 'data:image/jpeg;base64,' + base64.b64encode(
+            _encode(placeholder, 'JPEG', quality=40)
+        ).decode(),
+    }
+
+
+def build_for_image(name, force=False):
+    """Сохраняет варианты картинки name во все посты с этой картинкой.
+
+    Одна картинка бывает у многих постов (posts.storage): готовые
+    варианты любого из них переиспользуются без повторной нарезки.
+    update не вызывает сигналов сохранения, поэтому поколения
+    обновлённых постов увеличиваются здесь; кэш статей сбрасывается
+    по версии поста.
+    """
+    posts = Post.objects.filter(image=name)
+    variants = None
+    if not force:
+        ready = posts.exclude(image_variants='').only(
+            'image', 'image_variants'
+        )
+        variants = next(filter(None, map(get_variants, ready)), None)
+    if variants is None:
+        variants = build(name)
+    encoded = json.dumps(variants, separators=(',', ':'))
+    stale = list(
+        posts.exclude(image_variants=encoded).only(
+            'pk', 'author_id', 'group_id'
+        )
+    )
+    if not stale:
+        return 0
+    updated = Post.objects.filter(
+        pk__in=[post.pk for post in stale], image=name
+    ).update(image_variants=encoded)
+    scopes = set()
+    for post in stale:
+        scopes.update(post_cache_scopes(post))
+    bump_generation(*scopes)
+    return updated
+
+
+def _failure_key(name):
+    return f'image-variants-failed:{name}'
+
+
+def _build_in_background(name):
+    """build_for_image с учётом неудач для отложенного повтора."""
+    key = _failure_key(name)
+    try:
+        build_for_image(name)
+    except Exception:
+        failures = (cache.get(key) or {'failures': 0})['failures'] + 1
+        delay = min(RETRY_DELAY * 2 ** (failures - 1), RETRY_MAX_DELAY)
+        cache.set(
+            key,
+            {'failures': failures, 'retry': time.time() + delay},
+            RETRY_MAX_DELAY * 2,
+        )
+        raise
+    cache.delete(key)
+
+
+def schedule(post):
+    """Ставит нарезку вариантов картинки поста в фоновый пул.
+
+    После неудачной нарезки повтор не ставится до истечения паузы.
+    """
+    name = post.image.name
+    failure = cache.get(_failure_key(name))
+    if failure and failure['retry'] > time.time():
+        return
+    executor.submit(('variants', name), _build_in_background, name)
+
+
+def get_variants(post):
+    """Варианты текущей картинки поста или None, если их ещё нет."""
+    try:
+        variants = json.loads(post.image_variants)
+    except ValueError:
+        return None
+    if not isinstance(variants, dict) or (
+        variants.get('source') != post.image.name
+    ):
+        return None
+    return variants
@@ -0,0 +1,208 @@
+"""Массовая загрузка постов и комментариев из JSON Lines и CSV.
+
+Формат совпадает с выгрузкой posts.export: автор - имя пользователя,
+группа - слаг, комментарий ссылается на id поста из файла постов.
+Авторы и группы ищутся по словарям в памяти, недостающие догружаются
+одним запросом на пачку. Объекты создаются bulk_create по транзакции
+на пачку; post_save при этом не отправляется, поэтому счётчики, ленты,
+поисковый индекс и кэш пересчитываются один раз - bulk.rebuild_derived.
+
+Постам назначаются id после текущего максимума, чтобы комментарии можно
+было связать с ними без повторного чтения базы. Поэтому одновременно
+с загрузкой посты создаваться не должны; в PostgreSQL после загрузки
+нужно выполнить sqlsequencereset.
+"""
+import csv
+import json
+import logging
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .bulk import BATCH_SIZE, batched, manual_dates
+from .export import parse_moment
+from .models import Comment, Group, Post
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+FORMATS = ('jsonl', 'csv')
+# Размер списка в WHERE ... IN при поиске авторов и групп
+LOOKUP_SIZE: int = 500
+# Сколько причин пропуска строк запоминать для отчёта
+MAX_ERRORS: int = 20
+
+
+def read_records(stream, record_format='jsonl'):
+    """Пары (номер строки, словарь) из текстового потока.
+
+    Для строки, которую не удалось разобрать, вместо словаря - None.
+    """
+    if record_format == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield line_number, record if isinstance(record, dict) else None
+
+
+def _value(record, key):
+    """Значение поля; пустая строка CSV означает его отсутствие."""
+    value = record.get(key)
+    return None if value in ('', None) else value
+
+
+def _text(record):
+    text = _value(record, 'text')
+    if text is None:
+        raise ValueError('пустой текст')
+    return str(text)
+
+
+def _moment(record, key):
+    value = _value(record, key)
+    return parse_moment(str(value)) if value else timezone.now()
+
+
+class Importer:
+    """Загрузка с общими словарями авторов, групп и id постов.
+
+    Ход загрузки передаётся в log; по умолчанию - в журнал модуля.
+    """
+
+    def __init__(self, create_authors=False, batch_size=BATCH_SIZE,
+                 log=logger.info):
+        self.create_authors = create_authors
+        self.batch_size = batch_size
+        self.log = log
+        # Имя пользователя -> pk, слаг -> pk, id поста в файле -> pk
+        self.authors = {}
+        self.groups = {}
+        self.post_ids = {}
+        self.skipped = 0
+        self.errors = []
+        self.last_post_id = None
+
+    def _skip(self, line_number, reason):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f'строка {line_number}: {reason}')
+
+    def _fetch(self, known, model, field, values):
+        """Дополняет словарь known парами значение field -> pk."""
+        missing = {str(value) for value in values if value is not None}
+        missing -= known.keys()
+        for chunk in batched(missing, LOOKUP_SIZE):
+            known.update(
+                model.objects.filter(**{f'{field}__in': chunk})
+                .values_list(field, 'pk')
+            )
+        return missing - known.keys()
+
+    def _resolve_authors(self, records):
+        names = [_value(record, 'author') for record in records]
+        missing = self._fetch(self.authors, User, 'username', names)
+        if missing and self.create_authors:
+            # Пароль непригоден для входа, хэшируется один раз
+            password = make_password(None)
+            User.objects.bulk_create(
+                User(username=name, password=password) for name in missing
+            )
+            self._fetch(self.authors, User, 'username', missing)
+
+    def _resolve_groups(self, records):
+        """Находит группы по слагу; новые создаются с названием-слагом."""
+        slugs = [_value(record, 'group') for record in records]
+        missing = self._fetch(self.groups, Group, 'slug', slugs)
+        if missing:
+            Group.objects.bulk_create(
+                Group(title=slug, slug=slug, description='')
+                for slug in missing
+            )
+            self._fetch(self.groups, Group, 'slug', missing)
+
+    def _author_id(self, record):
+        author = _value(record, 'author')
+        if author is None:
+            raise ValueError('не указан автор')
+        try:
+            return self.authors[str(author)]
+        except KeyError:
+            raise ValueError(f'нет пользователя {author}')
+
+    def _load(self, model, records, build):
+        """Создаёт объекты build(record) пачками; возвращает их число."""
+        created = 0
+        for batch in batched(records, self.batch_size):
+            parsed = [record for _, record in batch if record is not None]
+            self._resolve_authors(parsed)
+            if model is Post:
+                self._resolve_groups(parsed)
+            objects = []
+            for line_number, record in batch:
+                if record is None:
+                    self._skip(line_number, 'не удалось разобрать строку')
+                    continue
+                try:
+                    objects.append(build(record))
+                except (ValueError, TypeError) as error:
+                    self._skip(line_number, error)
+            with transaction.atomic():
+                model.objects.bulk_create(objects)
+            created += len(objects)
+            self.log(f'{model._meta.verbose_name_plural}: {created}')
+        return created
+
+    def _post(self, record):
+        group = _value(record, 'group')
+        post = Post(
+            text=_text(record),
+            pub_date=_moment(record, 'pub_date'),
+            author_id=self._author_id(record),
+            group_id=self.groups[str(group)] if group is not None else None,
+            image=_value(record, 'image') or '',
+        )
+        source_id = _value(record, 'id')
+        self.last_post_id += 1
+        post.pk = self.last_post_id
+        if source_id is not None:
+            self.post_ids[int(source_id)] = post.pk
+        return post
+
+    def _comment(self, record):
+        source_id = _value(record, 'post')
+        if source_id is None:
+            raise ValueError('не указан пост')
+        post_id = self.post_ids.get(int(source_id))
+        if post_id is None:
+            raise ValueError(f'нет поста {source_id} в загрузке')
+        return Comment(
+            post_id=post_id,
+            author_id=self._author_id(record),
+            text=_text(record),
+            created=_moment(record, 'created'),
+        )
+
+    def import_posts(self, records):
+        """Загружает посты из пар (номер строки, словарь)."""
+        if self.last_post_id is None:
+            self.last_post_id = (
+                Post.objects.aggregate(last=Max('pk'))['last'] or 0
+            )
+        with manual_dates(Post, 'pub_date'):
+            return self._load(Post, records, self._post)
+
+    def import_comments(self, records):
+        """Загружает комментарии к постам, загруженным этим же объектом."""
+        with manual_dates(Comment, 'created'):
+            return self._load(Comment, records, self._comment)
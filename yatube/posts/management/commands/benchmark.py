@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment,
+)
+
+from posts import benchmark
+from posts.seed import seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет запросы к БД, время и память страниц posts '
+        'на сгенерированных данных во временной базе'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--follows', type=int, default=200)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--budget', default=benchmark.BUDGET_FILE)
+        parser.add_argument(
+            '--update-budget', action='store_true',
+            help='Записать бюджет по результатам замеров',
+        )
+        parser.add_argument(
+            '--strict', action='store_true',
+            help=(
+                'Проверять и время с памятью - только на машине, '
+                'где записан бюджет'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True
+        )
+        try:
+            with override_settings(BACKGROUND_WORKERS=0):
+                seed(
+                    users=options['users'],
+                    groups=options['groups'],
+                    posts=options['posts'],
+                    follows=options['follows'],
+                    comments=options['comments'],
+                )
+                results = benchmark.run(repeat=options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        for name, metrics in results.items():
+            self.stdout.write(f'{name:<24}' + '  '.join(
+                f'{metric}={value}' for metric, value in metrics.items()
+            ))
+        if options['update_budget']:
+            benchmark.save_budget(results, options['budget'])
+            self.stdout.write(self.style.SUCCESS('Бюджет записан'))
+            return
+        metrics = (
+            benchmark.METRICS if options['strict']
+            else benchmark.PORTABLE_METRICS
+        )
+        failures = benchmark.check(
+            results, benchmark.load_budget(options['budget']), metrics
+        )
+        if failures:
+            raise CommandError('\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('Бюджет соблюдён'))
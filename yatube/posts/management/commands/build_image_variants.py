@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts import images
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт адаптивные варианты картинок постов, у которых их нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать варианты всех картинок',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').only('image', 'image_variants')
+        # Картинка общая у постов с одинаковым содержимым - режем один раз
+        names = sorted({
+            post.image.name for post in posts.iterator()
+            if options['force'] or images.get_variants(post) is None
+        })
+        updated = 0
+        for name in names:
+            try:
+                updated += images.build_for_image(name, options['force'])
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'{name}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок: {len(names)}, обновлено постов: {updated}'
+        ))
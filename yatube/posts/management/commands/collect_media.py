@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from posts import media
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки постов и их варианты, на которые не ссылается '
+        'ни один пост, вместе с миниатюрами'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=media.GARBAGE_MIN_AGE,
+            help='Не трогать файлы моложе стольких секунд',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать файлы без ссылок',
+        )
+
+    def handle(self, *args, **options):
+        removed, freed = media.collect_garbage(
+            options['min_age'], options['dry_run']
+        )
+        action = 'Найдено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} файлов без ссылок: {removed}, '
+            f'{freed / 1024 / 1024:.1f} МБ'
+        ))
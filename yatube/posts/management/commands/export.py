@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает посты, комментарии, подписки или группы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(export.EXPORTS))
+        parser.add_argument(
+            '--format', choices=export.FORMATS, default='jsonl'
+        )
+        parser.add_argument(
+            '--since', help='Не раньше даты (YYYY-MM-DD или ISO 8601)'
+        )
+        parser.add_argument(
+            '--until', help='Не позже даты (YYYY-MM-DD или ISO 8601)'
+        )
+        parser.add_argument('--author', help='Имя пользователя автора')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument(
+            '--output', help='Файл выгрузки; по умолчанию stdout'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            since, until = (
+                export.parse_moment(options[name], end=end)
+                if options[name] else None
+                for name, end in (('since', False), ('until', True))
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        rows = export.get_rows(
+            options['kind'], since, until, options['author']
+        )
+        chunks = export.encode(
+            export.serialize(options['kind'], rows, options['format']),
+            options['gzip'],
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                output.writelines(chunks)
+            return
+        output = getattr(self.stdout, 'buffer', None) or sys.stdout.buffer
+        output.writelines(chunks)
+        output.flush()
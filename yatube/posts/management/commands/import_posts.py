@@ -0,0 +1,91 @@
+import gzip
+import io
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.bulk import BATCH_SIZE, rebuild_derived
+from posts.importer import FORMATS, Importer, read_records
+
+
+def _open(path):
+    """Текстовый поток файла; '-' - stdin, .gz распаковывается на лету."""
+    if path == '-':
+        return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def _format(path, chosen):
+    if chosen:
+        return chosen
+    return 'csv' if path.rsplit('.gz', 1)[0].endswith('.csv') else 'jsonl'
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты и комментарии из JSON Lines или CSV '
+        'в формате команды export'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'posts', help='Файл постов (.jsonl, .csv, возможно .gz) или -'
+        )
+        parser.add_argument(
+            '--comments', help='Файл комментариев к этим постам'
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файлов; по умолчанию - по расширению',
+        )
+        parser.add_argument(
+            '--create-authors', action='store_true',
+            help='Создавать недостающих пользователей без пароля',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--no-rebuild', action='store_true',
+            help='Не пересчитывать счётчики, ленты и поисковый индекс',
+        )
+
+    def _report(self, importer, path):
+        for error in importer.errors:
+            self.stderr.write(f'{path}: {error}')
+        if importer.skipped > len(importer.errors):
+            self.stderr.write(
+                f'{path}: и ещё {importer.skipped - len(importer.errors)}'
+            )
+        importer.errors, importer.skipped = [], 0
+
+    def handle(self, *args, **options):
+        log = self.stdout.write if options['verbosity'] > 1 else (
+            lambda message: None
+        )
+        importer = Importer(
+            create_authors=options['create_authors'],
+            batch_size=options['batch_size'],
+            log=log,
+        )
+        imported = {}
+        for kind, load in (
+            ('posts', importer.import_posts),
+            ('comments', importer.import_comments),
+        ):
+            path = options[kind]
+            if not path:
+                continue
+            with _open(path) as stream:
+                imported[kind] = load(
+                    read_records(stream, _format(path, options['format']))
+                )
+            self._report(importer, path)
+        if not options['no_rebuild']:
+            log('Пересчёт производных данных')
+            rebuild_derived()
+        self.stdout.write(self.style.SUCCESS(
+            'Загружено постов: {}, комментариев: {}'.format(
+                imported.get('posts', 0), imported.get('comments', 0)
+            )
+        ))
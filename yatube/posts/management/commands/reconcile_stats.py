@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.stats import reconcile
+from posts.timeline import rebalance
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики постов и подписок авторов и возвращает '
+        'раскладку в ленты авторам с небольшим числом подписчиков'
+    )
+
+    def handle(self, *args, **options):
+        fixed = reconcile()
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено записей статистики: {fixed}')
+        )
+        resumed = rebalance()
+        self.stdout.write(
+            self.style.SUCCESS(f'Авторов с раскладкой в ленты: {resumed}')
+        )
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from posts.seed import seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу сгенерированными пользователями, группами, '
+        'постами, подписками и комментариями'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--follows', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=1000000)
+        parser.add_argument(
+            '--follower-skew', type=float, default=1.1,
+            help='Показатель степенного закона подписчиков, 0 - равномерно',
+        )
+        parser.add_argument(
+            '--group-skew', type=float, default=1.0,
+            help='Показатель степенного закона групп, 0 - равномерно',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько последних дней распределены даты постов',
+        )
+        parser.add_argument('--random-seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        log = self.stdout.write if options['verbosity'] > 1 else (
+            lambda message: None
+        )
+        seed(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            follows=options['follows'],
+            comments=options['comments'],
+            follower_skew=options['follower_skew'],
+            group_skew=options['group_skew'],
+            days=options['days'],
+            random_seed=options['random_seed'],
+            log=log,
+        )
+        self.stdout.write(self.style.SUCCESS('Данные созданы'))
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import stress
+
+
+class Command(BaseCommand):
+    help = (
+        'Читает страницы posts параллельно с созданием постов '
+        'и комментариев во временной файловой базе SQLite'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--comments', type=int, default=2000)
+        parser.add_argument('--duration', type=float, default=10.0)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--journal-mode', default=settings.SQLITE_PRAGMAS['journal_mode'],
+            help='Режим журнала для сравнения, например DELETE',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Проверка рассчитана на SQLite')
+        with stress.seeded_database(
+            pragmas={'journal_mode': options['journal_mode']},
+            users=options['users'],
+            posts=options['posts'],
+            comments=options['comments'],
+        ):
+            results = stress.run(
+                duration=options['duration'],
+                readers=options['readers'],
+                writers=options['writers'],
+            )
+        errors = results.pop('errors')
+        self.stdout.write('  '.join(
+            f'{name}={value}' for name, value in results.items()
+        ))
+        if errors:
+            raise CommandError(
+                f'Ошибок: {len(errors)}\n' + '\n'.join(sorted(set(errors)))
+            )
+        self.stdout.write(self.style.SUCCESS('Ошибок нет'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import stress
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность страниц posts через WSGI '
+        'и ASGI при одновременных клиентах'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--comments', type=int, default=2000)
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument(
+            '--clients', type=int, nargs='+', default=[1, 4, 16],
+            help='Числа одновременных клиентов',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Проверка рассчитана на SQLite')
+        with stress.seeded_database(
+            users=options['users'],
+            posts=options['posts'],
+            comments=options['comments'],
+        ):
+            for clients in options['clients']:
+                results = stress.throughput(clients, options['duration'])
+                self.stdout.write(f'clients={clients:<4}' + '  '.join(
+                    f'{name}={value}' for name, value in results.items()
+                ))
@@ -0,0 +1,77 @@
+"""Учёт ссылок на файлы картинок и сборка мусора в медиа.
+
+Картинки хранятся по хешу содержимого (posts.storage) и делятся между
+постами, поэтому при удалении или правке поста файл не удаляется.
+collect_garbage считает ссылки на каждый файл по таблице постов и
+удаляет картинки и варианты без ссылок вместе с миниатюрами sorl.
+"""
+import os
+import time
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from . import images
+from .models import Post
+
+# Файлы моложе этого возраста не удаляются: пост с только что
+# загруженной картинкой может быть ещё не сохранён
+GARBAGE_MIN_AGE: int = 60 * 60
+
+
+def _walk(storage, directory):
+    """Имена всех файлов каталога хранилища, включая вложенные."""
+    if not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield f'{directory}/{name}'
+    for subdirectory in directories:
+        yield from _walk(storage, f'{directory}/{subdirectory}')
+
+
+def references():
+    """Число постов, ссылающихся на каждый файл картинки и её вариантов."""
+    counts = Counter()
+    posts = Post.objects.exclude(image='').only('image', 'image_variants')
+    for post in posts.iterator():
+        counts[post.image.name] += 1
+        variants = images.get_variants(post)
+        if variants is not None:
+            counts.update(name for name, _ in variants['sources'])
+    return counts
+
+
+def _is_old(storage, name, min_age):
+    return time.time() - os.path.getmtime(storage.path(name)) >= min_age
+
+
+def collect_garbage(min_age=GARBAGE_MIN_AGE, dry_run=False):
+    """Удаляет картинки и варианты без ссылок, а также их миниатюры.
+
+    Возвращает число удалённых файлов и освобождённые байты.
+    """
+    counts = references()
+    image_storage = Post._meta.get_field('image').storage
+    upload_to = Post._meta.get_field('image').upload_to.rstrip('/')
+    candidates = [
+        (image_storage, name, True)
+        for name in _walk(image_storage, upload_to)
+    ] + [
+        (default_storage, name, False)
+        for name in _walk(default_storage, images.VARIANTS_DIR)
+    ]
+    removed = freed = 0
+    for storage, name, is_source in candidates:
+        if counts[name] or not _is_old(storage, name, min_age):
+            continue
+        removed += 1
+        freed += storage.size(name)
+        if dry_run:
+            continue
+        if is_source:
+            default.kvstore.delete_thumbnails(ImageFile(name, storage))
+        storage.delete(name)
+    return removed, freed
@@ -0,0 +1,92 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BACKFILL_COUNT = 1000
+
+
+def fill_timelines(apps, schema_editor):
+    """Наполняет ленты по уже существующим подпискам."""
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    for follow in Follow.objects.all().iterator():
+        posts = (
+            Post.objects.filter(author_id=follow.author_id)
+            .order_by('-pub_date')
+            .values_list('pk', flat=True)[:BACKFILL_COUNT]
+        )
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(user_id=follow.user_id, post_id=post_id)
+                for post_id in posts
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0003_create_new_models'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='comment',
+            options={'verbose_name': 'Комментарий', 'verbose_name_plural': 'Комментарии'},
+        ),
+        migrations.AlterModelOptions(
+            name='follow',
+            options={'verbose_name': 'Подписка', 'verbose_name_plural': 'Подписки'},
+        ),
+        migrations.AlterModelOptions(
+            name='group',
+            options={'verbose_name': 'Группа', 'verbose_name_plural': 'Группы'},
+        ),
+        migrations.AddField(
+            model_name='follow',
+            name='fan_out',
+            field=models.BooleanField(default=True, help_text='Посты автора раскладываются в ленту подписчика при записи', verbose_name='Рассылка в ленту'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Дата публикации'),
+        ),
+        migrations.AlterField(
+            model_name='group',
+            name='description',
+            field=models.TextField(verbose_name='Описание'),
+        ),
+        migrations.AlterField(
+            model_name='group',
+            name='slug',
+            field=models.SlugField(unique=True, verbose_name='URL'),
+        ),
+        migrations.AlterField(
+            model_name='group',
+            name='title',
+            field=models.CharField(max_length=200, verbose_name='Название группы'),
+        ),
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_entry'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def fill_stats(apps, schema_editor):
+    """Считает счётчики по уже существующим постам и подпискам."""
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    stats = {}
+    sources = (
+        (Post.objects, 'author', 'posts_count'),
+        (Follow.objects, 'author', 'followers_count'),
+        (Follow.objects, 'user', 'following_count'),
+    )
+    for manager, key, field in sources:
+        rows = manager.order_by().values(key).annotate(total=Count('pk'))
+        for row in rows:
+            stats.setdefault(row[key], {})[field] = row['total']
+    AuthorStats.objects.bulk_create(
+        [
+            AuthorStats(user_id=user_id, **counters)
+            for user_id, counters in stats.items()
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0004_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
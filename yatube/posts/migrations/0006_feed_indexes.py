@@ -0,0 +1,56 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:07
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    """Оставляет по одной подписке на пару подписчик-автор.
+
+    Счётчики подписок после этого пересчитывает reconcile_stats.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    duplicates = (
+        Follow.objects.order_by().values('user', 'author')
+        .annotate(first=Min('pk'), total=Count('pk'))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        Follow.objects.filter(
+            user=row['user'], author=row['author']
+        ).exclude(pk=row['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_author_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-pub_date', '-id'], name='post_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date', '-id'],
+                name='post_author_date_idx',),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date', '-id'],
+                name='post_group_date_idx',),
+        ),
+        migrations.RunPython(
+            remove_duplicate_follows, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:40
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.utils.timezone
+
+
+def copy_pub_dates(apps, schema_editor):
+    """Копирует даты постов в уже разложенные записи лент."""
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    TimelineEntry.objects.update(
+        pub_date=Subquery(
+            Post.objects.filter(pk=OuterRef('post_id')).values('pub_date')
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timelineentry',
+            name='pub_date',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата публикации поста'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_pub_dates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-pub_date', '-post'], name='timeline_user_date_idx'),
+        ),
+    ]
@@ -1,8 +1,10 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
 
 from core.models import CreatedModel
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -27,6 +29,21 @@ class Post(models.Model):
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Ленты читаются по убыванию даты: общая, автора и группы;
+        # id - второй ключ сортировки курсорного паджинатора
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_date_idx',
+            ),
+        ]
 
     text = models.TextField(
         'Текст поста',
@@ -54,19 +71,41 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
+        blank=True,
+    )
+    # Заполняется в фоне после загрузки картинки (posts.images)
+    image_variants = models.TextField(
+        'Варианты картинки',
         blank=True,
+        editable=False,
     )
 
     def __str__(self) -> str:
         """Выводит текст начала поста."""
         return self.text[:15]
 
+    @transaction.atomic
+    def save(self, *args, **kwargs):
+        """Сохраняет пост в одной транзакции с обработчиками post_save.
+
+        Они обновляют счётчики автора и ленты подписчиков: если это не
+        удалось, откатывается и сам пост. Удаление уже атомарно.
+        """
+        super().save(*args, **kwargs)
+
 
 class Comment(CreatedModel):
     """Модель комментариев."""
     class Meta:
+        ordering = ['created']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', 'created'], name='comment_post_created_idx'
+            ),
+        ]
 
     post = models.ForeignKey(
         Post,
@@ -91,6 +130,12 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow',
+            ),
+        ]
 
     user = models.ForeignKey(
         User,
@@ -104,3 +149,72 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following',
     )
+    fan_out = models.BooleanField(
+        'Рассылка в ленту',
+        default=True,
+        help_text='Посты автора раскладываются в ленту подписчика при записи',
+    )
+
+    @transaction.atomic
+    def save(self, *args, **kwargs):
+        """Сохраняет подписку в одной транзакции со счётчиками и лентой."""
+        super().save(*args, **kwargs)
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок.
+
+    Дата поста копируется в запись: лента читается по индексу
+    (user, -pub_date, -post) без сортировки соединения с постами.
+    """
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_date_idx',
+            ),
+        ]
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Подписчик',
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Пост',
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField('Дата публикации поста')
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики автора."""
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    user = models.OneToOneField(
+        User,
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    def __str__(self) -> str:
+        """Отображает автора статистики."""
+        return str(self.user)
@@ -0,0 +1,192 @@
+"""Генерация набора данных для профилирования и замеров.
+
+Объекты создаются пачками через bulk_create, минуя сигналы, поэтому
+производные данные пересчитываются в конце (bulk.rebuild_derived).
+Данные воспроизводимы: одинаковые параметры и random_seed дают одинаковый
+набор. Подписчики распределены по степенному закону (немногие авторы
+собирают большую часть подписок), посты - с перекосом в "горячие" группы.
+"""
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .bulk import batched, manual_dates, rebuild_derived
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+WORDS = (
+    'лето море книга город дорога утро вечер музыка кофе друг работа '
+    'дом история путешествие погода поезд сад зима письмо фильм'
+).split()
+# Доля постов вне групп
+NO_GROUP_SHARE: float = 0.3
+# Наибольшая доля всех возможных пар подписок: при большей доле
+# случайный подбор новых пар почти не находит
+MAX_FOLLOW_SHARE: float = 0.5
+# Попыток подбора на одну пару, после них подбор прекращается
+FOLLOW_ATTEMPTS: int = 20
+
+
+def _text(rng, words=30):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _zipf_weights(count, skew):
+    """Накопленные веса рангов 1..count по закону Ципфа."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+def _dates(rng, now, days):
+    seconds = days * 24 * 60 * 60
+    return lambda: now - timedelta(seconds=rng.randrange(seconds))
+
+
+def _last_pk(model):
+    return model.objects.aggregate(last=Max('pk'))['last'] or 0
+
+
+def _create(model, objects, log):
+    """Создаёт объекты пачками, по транзакции на пачку.
+
+    Возвращает число добавленных строк: строки, нарушающие уникальность,
+    bulk_create пропускает. Новые строки получают pk больше прежних,
+    поэтому считаются по индексу pk, без COUNT(*) всей таблицы.
+    """
+    created = 0
+    last_pk = _last_pk(model)
+    for batch in batched(objects):
+        with transaction.atomic():
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            created += model.objects.filter(pk__gt=last_pk).count()
+            last_pk = _last_pk(model)
+        log(f'{model._meta.verbose_name_plural}: {created}')
+    return created
+
+
+def _create_users(count, log):
+    start = User.objects.filter(username__startswith='seed-user-').count()
+    # Один хэш на всех: хэширование пароля - самая медленная часть
+    password = make_password(None)
+    _create(User, (
+        User(
+            username=f'seed-user-{number}',
+            first_name='Автор',
+            last_name=str(number),
+            password=password,
+        )
+        for number in range(start, start + count)
+    ), log)
+
+
+def _create_groups(count, rng, log):
+    start = Group.objects.filter(slug__startswith='seed-group-').count()
+    _create(Group, (
+        Group(
+            title=f'Группа {number}',
+            slug=f'seed-group-{number}',
+            description=_text(rng, 10),
+        )
+        for number in range(start, start + count)
+    ), log)
+
+
+def _follow_pairs(rng, user_ids, count, skew):
+    """Уникальные пары (подписчик, автор) со степенным законом авторов.
+
+    Пар не больше MAX_FOLLOW_SHARE от возможных; подбор останавливается
+    и раньше, если за FOLLOW_ATTEMPTS попыток на пару их не набралось.
+    """
+    authors = list(user_ids)
+    rng.shuffle(authors)
+    weights = _zipf_weights(len(authors), skew)
+    possible = len(user_ids) * (len(user_ids) - 1)
+    limit = min(count, int(possible * MAX_FOLLOW_SHARE))
+    # Пара хранится одним числом: на миллионах подписок это вдвое
+    # экономнее кортежей
+    base = max(user_ids, default=0) + 1
+    seen = set()
+    for _ in range(limit * FOLLOW_ATTEMPTS):
+        if len(seen) >= limit:
+            return
+        user_id = rng.choice(user_ids)
+        author_id = rng.choices(authors, cum_weights=weights)[0]
+        pair = user_id * base + author_id
+        if user_id == author_id or pair in seen:
+            continue
+        seen.add(pair)
+        yield user_id, author_id
+
+
+def seed(users=20, groups=5, posts=500, follows=50, comments=500,
+         follower_skew=1.1, group_skew=1.0, days=365, random_seed=0,
+         log=lambda message: None):
+    """Создаёт набор данных заданного размера.
+
+    Имена пользователей - seed-user-N, слаги групп - seed-group-N; новые
+    объекты добавляются к уже существующим. follower_skew и group_skew -
+    показатели степенного закона для подписчиков и групп (0 - равномерно).
+    Без пользователей в базе посты и комментарии не создаются, без
+    постов - комментарии.
+    """
+    rng = random.Random(random_seed)
+    date = _dates(rng, timezone.now(), days)
+    _create_users(users, log)
+    _create_groups(groups, rng, log)
+    user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+    group_ids = list(
+        Group.objects.order_by('pk').values_list('pk', flat=True)
+    )
+    rng.shuffle(group_ids)
+    group_weights = _zipf_weights(len(group_ids), group_skew)
+
+    def post_group():
+        if not group_ids or rng.random() < NO_GROUP_SHARE:
+            return None
+        return rng.choices(group_ids, cum_weights=group_weights)[0]
+
+    if not user_ids:
+        log('Пользователей нет: посты и комментарии не создаются')
+        posts = comments = 0
+    with manual_dates(Post, 'pub_date'):
+        _create(Post, (
+            Post(
+                text=_text(rng),
+                author_id=rng.choice(user_ids),
+                group_id=post_group(),
+                pub_date=date(),
+            )
+            for _ in range(posts)
+        ), log)
+    _create(Follow, (
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id, author_id in _follow_pairs(
+            rng, user_ids, follows, follower_skew
+        )
+    ), log)
+    post_ids = []
+    if comments:
+        post_ids = list(
+            Post.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        if not post_ids:
+            log('Постов нет: комментарии не создаются')
+    if post_ids:
+        with manual_dates(Comment, 'created'):
+            _create(Comment, (
+                Comment(
+                    post_id=rng.choice(post_ids),
+                    author_id=rng.choice(user_ids),
+                    text=_text(rng, 12),
+                    created=date(),
+                )
+                for _ in range(comments)
+            ), log)
+    log('Пересчёт счётчиков, лент и поискового индекса')
+    rebuild_derived()
@@ -0,0 +1,95 @@
+"""Обработчики сигналов моделей постов.
+
+Post.save и Follow.save атомарны, а удаление Django и так выполняет
+в транзакции: счётчики и ленты меняются вместе со строкой.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from core.cache import bump_generation
+
+from . import stats, timeline
+from .cache_scopes import post_cache_scopes
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Поля пользователя, которые выводятся в статьях и комментариях
+DISPLAY_FIELDS = frozenset(('username', 'first_name', 'last_name'))
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    """Запоминает исходную группу: при смене сбросим кэш и её страницы."""
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    """Сбрасывает кэш лент, раскладывает пост и обновляет счётчик."""
+    bump_generation(*post_cache_scopes(instance))
+    instance._loaded_group_id = instance.group_id
+    if created and not raw:
+        bump_generation(f'user:{instance.author_id}')
+        stats.increment(instance.author_id, 'posts_count')
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    """Сбрасывает кэш лент и обновляет счётчик постов автора."""
+    bump_generation(
+        *post_cache_scopes(instance), f'user:{instance.author_id}'
+    )
+    stats.decrement(instance.author_id, 'posts_count')
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    """Наполняет ленту подписчика и обновляет счётчики подписок."""
+    if created and not raw:
+        bump_generation(
+            f'user:{instance.author_id}', f'user:{instance.user_id}'
+        )
+        stats.increment(instance.author_id, 'followers_count')
+        stats.increment(instance.user_id, 'following_count')
+        timeline.follow_added(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """Убирает посты автора из ленты и обновляет счётчики подписок."""
+    bump_generation(f'user:{instance.author_id}', f'user:{instance.user_id}')
+    stats.decrement(instance.author_id, 'followers_count')
+    stats.decrement(instance.user_id, 'following_count')
+    timeline.follow_removed(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    """Название группы выводится во всех лентах - сбрасываем их кэш."""
+    bump_generation('groups', f'group:{instance.pk}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    """Сбрасывает кэш страницы поста."""
+    bump_generation(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Имя пользователя выводится на его страницах и в шапке.
+
+    В лентах и комментариях оно выводится у всех постов автора, поэтому
+    при возможной смене имени сбрасывается и область users. Вход
+    сохраняет только last_login и её не трогает.
+    """
+    bump_generation(f'user:{instance.pk}')
+    if not created and (
+        update_fields is None or DISPLAY_FIELDS & set(update_fields)
+    ):
+        bump_generation('users')
@@ -0,0 +1,97 @@
+"""Денормализованные счётчики постов и подписок автора."""
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Follow, Post
+
+User = get_user_model()
+
+BATCH_SIZE: int = 1000
+FIELDS = ('posts_count', 'followers_count', 'following_count')
+
+
+def get_stats(user):
+    """Счётчики пользователя; без запроса, если stats выбраны заранее.
+
+    Отсутствие записи означает нулевые счётчики.
+    """
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return AuthorStats(user=user)
+
+
+def increment(user_id, field):
+    """Увеличивает счётчик, создавая запись при необходимости."""
+    stats = AuthorStats.objects.filter(user_id=user_id)
+    if stats.update(**{field: F(field) + 1}):
+        return
+    try:
+        with transaction.atomic():
+            AuthorStats.objects.create(user_id=user_id, **{field: 1})
+    except IntegrityError:
+        # Запись успели создать параллельно
+        stats.update(**{field: F(field) + 1})
+
+
+def decrement(user_id, field):
+    """Уменьшает счётчик, не опуская его ниже нуля."""
+    AuthorStats.objects.filter(user_id=user_id, **{f'{field}__gt': 0}).update(
+        **{field: F(field) - 1}
+    )
+
+
+def _count(queryset, field):
+    counts = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def _flush(to_create, to_update):
+    with transaction.atomic():
+        AuthorStats.objects.bulk_create(to_create)
+        AuthorStats.objects.bulk_update(
+            to_update, FIELDS, batch_size=BATCH_SIZE
+        )
+
+
+def reconcile():
+    """Пересчитывает счётчики всех пользователей.
+
+    Возвращает число исправленных записей.
+    """
+    users = User.objects.annotate(
+        real_posts=_count(Post.objects, 'author'),
+        real_followers=_count(Follow.objects, 'author'),
+        real_following=_count(Follow.objects, 'user'),
+    ).values_list(
+        'pk', 'stats__user',
+        'real_posts', 'real_followers', 'real_following',
+        *(f'stats__{field}' for field in FIELDS),
+    )
+    fixed = 0
+    last_pk = 0
+    # Пачки по ключу: запись идёт между чтениями, а не во время них
+    while True:
+        batch = list(
+            users.filter(pk__gt=last_pk).order_by('pk')[:BATCH_SIZE]
+        )
+        if not batch:
+            return fixed
+        last_pk = batch[-1][0]
+        to_create, to_update = [], []
+        for user_id, stats_id, *values in batch:
+            real, stored = values[:len(FIELDS)], values[len(FIELDS):]
+            if real == stored or (stats_id is None and not any(real)):
+                continue
+            stats = AuthorStats(user_id=user_id, **dict(zip(FIELDS, real)))
+            (to_update if stats_id else to_create).append(stats)
+        _flush(to_create, to_update)
+        fixed += len(to_create) + len(to_update)
@@ -0,0 +1,63 @@
+"""Хранилище картинок постов с адресацией по содержимому.
+
+Загрузка пишется на диск во временный файл и одновременно хешируется,
+затем файл переименовывается в <каталог>/<2 символа хеша>/<хеш>.<расш>.
+Одна и та же картинка хранится один раз, сколько бы постов её ни
+использовали, а задачи по картинке (варианты, миниатюры) ставятся по
+имени файла и тоже выполняются один раз.
+
+Файлы при удалении и правке постов не удаляются - их собирает
+posts.media.collect_garbage.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASH_PREFIX_LENGTH: int = 2
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, в котором имя файла - хеш его содержимого."""
+
+    def get_available_name(self, name, max_length=None):
+        # Одинаковое имя значит одинаковое содержимое: суффиксы не нужны
+        return name
+
+    def _save(self, name, content):
+        directory, basename = os.path.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+        digest = hashlib.sha256()
+        descriptor, temp_path = tempfile.mkstemp(
+            dir=full_directory, prefix='.upload-'
+        )
+        try:
+            with os.fdopen(descriptor, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+            hexdigest = digest.hexdigest()
+            prefix = hexdigest[:HASH_PREFIX_LENGTH]
+            name = os.path.join(directory, prefix, hexdigest + extension)
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                os.remove(temp_path)
+                # Свежее время изменения защищает файл от сборки мусора,
+                # пока пост с ним ещё не сохранён
+                os.utime(full_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.chmod(temp_path, self.file_permissions_mode or 0o644)
+                # Переименование атомарно: параллельная загрузка той же
+                # картинки заменит файл таким же
+                os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name.replace('\\', '/')
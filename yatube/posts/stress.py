@@ -0,0 +1,249 @@
+"""Нагрузочные проверки во временной файловой базе SQLite.
+
+run: писатели в своих потоках создают посты и комментарии через
+post_create и add_comment, читатели в это время запрашивают ленту,
+страницы постов и групп. В режиме WAL чтение не ждёт пишущих транзакций,
+поэтому время ответа читателей не растёт, а ошибок "database is locked"
+нет.
+
+throughput: пропускная способность чтения страниц одновременными
+клиентами через WSGI-приложение и через ASGI-адаптер core.asgi.
+"""
+import asyncio
+import io
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.urls import reverse
+
+from core.asgi import WsgiToAsgi, build_environ
+
+from .benchmark import _percentile
+from .models import Group, Post
+from .seed import seed
+
+User = get_user_model()
+
+
+@contextmanager
+def seeded_database(pragmas=None, users=50, posts=2000, comments=2000):
+    """Временная файловая база с данными вместо основной.
+
+    Блокировки видны только в файловой базе, а не в памяти, как
+    у тестовой базы по умолчанию. pragmas дополняют SQLITE_PRAGMAS.
+    """
+    setup_test_environment(debug=False)
+    directory = tempfile.TemporaryDirectory()
+    test_settings = connection.settings_dict['TEST']
+    test_name = test_settings.get('NAME')
+    test_settings['NAME'] = os.path.join(directory.name, 'stress.sqlite3')
+    try:
+        with override_settings(
+            SQLITE_PRAGMAS={**settings.SQLITE_PRAGMAS, **(pragmas or {})},
+            BACKGROUND_WORKERS=0,
+        ):
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True
+            )
+            try:
+                seed(
+                    users=users,
+                    groups=10,
+                    posts=posts,
+                    follows=users,
+                    comments=comments,
+                )
+                yield
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        test_settings['NAME'] = test_name
+        directory.cleanup()
+        teardown_test_environment()
+
+
+class _Worker(threading.Thread):
+    """Поток со своим клиентом и своим соединением с базой."""
+
+    def __init__(self, deadline, urls, user=None, random_seed=0):
+        super().__init__(daemon=True)
+        self.deadline = deadline
+        self.urls = urls
+        self.user = user
+        self.rng = random.Random(random_seed)
+        self.timings = []
+        self.errors = []
+
+    def request(self, client):
+        raise NotImplementedError
+
+    def run(self):
+        client = Client()
+        if self.user is not None:
+            client.force_login(self.user)
+        try:
+            while time.monotonic() < self.deadline:
+                started = time.perf_counter()
+                try:
+                    response = self.request(client)
+                except Exception as error:
+                    self.errors.append(f'{type(error).__name__}: {error}')
+                    continue
+                self.timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code not in (200, 302):
+                    self.errors.append(f'HTTP {response.status_code}')
+        finally:
+            connection.close()
+
+
+class _Reader(_Worker):
+    def request(self, client):
+        return client.get(self.rng.choice(self.urls))
+
+
+class _Writer(_Worker):
+    def request(self, client):
+        post_id = self.rng.choice(self.urls)
+        text = f'Нагрузочная запись {self.rng.random()}'
+        if self.rng.random() < 0.5:
+            return client.post(
+                reverse('posts:post_create'), {'text': text}
+            )
+        return client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post_id}),
+            {'text': text},
+        )
+
+
+def _read_urls(limit=100):
+    """Лента, страницы групп и постов - то, что читают чаще всего."""
+    urls = [reverse('posts:index')]
+    urls += [
+        reverse('posts:group_list', kwargs={'slug': slug})
+        for slug in Group.objects.values_list('slug', flat=True)[:limit]
+    ]
+    urls += [
+        reverse('posts:post_detail', kwargs={'post_id': pk})
+        for pk in Post.objects.values_list('pk', flat=True)[:limit]
+    ]
+    return urls
+
+
+def run(duration=10.0, readers=4, writers=2):
+    """Нагружает базу; возвращает число операций, время чтения и ошибки."""
+    deadline = time.monotonic() + duration
+    read_urls = _read_urls()
+    post_ids = list(Post.objects.values_list('pk', flat=True)[:100])
+    authors = list(User.objects.order_by('pk')[:writers])
+    workers = [
+        _Reader(deadline, read_urls, random_seed=number)
+        for number in range(readers)
+    ] + [
+        _Writer(deadline, post_ids, user=authors[number % len(authors)],
+                random_seed=number)
+        for number in range(writers)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    reads = [
+        timing for worker in workers if isinstance(worker, _Reader)
+        for timing in worker.timings
+    ]
+    return {
+        'reads': len(reads),
+        'writes': sum(
+            len(worker.timings) for worker in workers
+            if isinstance(worker, _Writer)
+        ),
+        'read_p50_ms': round(_percentile(reads, 50), 2) if reads else None,
+        'read_p95_ms': round(_percentile(reads, 95), 2) if reads else None,
+        'read_max_ms': round(max(reads), 2) if reads else None,
+        'errors': [error for worker in workers for error in worker.errors],
+    }
+
+
+def _scope(url):
+    path, _, query = url.partition('?')
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [(b'host', b'testserver')],
+    }
+
+
+def _wsgi_client(application, scopes, deadline, rng):
+    done = 0
+    while time.monotonic() < deadline:
+        environ = build_environ(rng.choice(scopes), io.BytesIO())
+        response = application(environ, lambda status, headers: None)
+        try:
+            b''.join(response)
+        finally:
+            response.close()
+        done += 1
+    connection.close()
+    return done
+
+
+async def _asgi_client(application, scopes, deadline, rng):
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        pass
+
+    done = 0
+    while time.monotonic() < deadline:
+        await application(rng.choice(scopes), receive, send)
+        done += 1
+    return done
+
+
+def throughput(clients=8, duration=5.0):
+    """Запросов в секунду через WSGI и через ASGI-адаптер."""
+    wsgi = get_wsgi_application()
+    scopes = [_scope(url) for url in _read_urls()]
+
+    deadline = time.monotonic() + duration
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        wsgi_done = sum(executor.map(
+            lambda number: _wsgi_client(
+                wsgi, scopes, deadline, random.Random(number)
+            ),
+            range(clients),
+        ))
+
+    asgi = WsgiToAsgi(wsgi, max_workers=clients)
+
+    async def load():
+        deadline = time.monotonic() + duration
+        return sum(await asyncio.gather(*(
+            _asgi_client(asgi, scopes, deadline, random.Random(number))
+            for number in range(clients)
+        )))
+
+    try:
+        asgi_done = asyncio.run(load())
+    finally:
+        asgi.executor.shutdown()
+    return {
+        'wsgi_rps': round(wsgi_done / duration, 1),
+        'asgi_rps': round(asgi_done / duration, 1),
+    }
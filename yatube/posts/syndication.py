@@ -0,0 +1,164 @@
+"""Ленты RSS и Atom: весь сайт, группа и автор.
+
+Лента читает только выводимые столбцы (FEED_FIELDS). Готовый XML
+кэшируется с поколением её областей в ключе: сигналы сохранения постов
+увеличивают поколение, и следующий запрос собирает ленту заново, а до
+того она отдаётся из кэша. Опрашивающие клиенты с If-Modified-Since или
+If-None-Match получают 304 без обращения к ленте (conditional_feed).
+"""
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from core.cache import get_generation
+
+from .conditional import (
+    conditional_feed, group_feed_scopes, profile_feed_scopes,
+    site_feed_scopes,
+)
+from .models import Group, Post
+
+User = get_user_model()
+
+FEED_SIZE: int = 20
+FEED_FIELDS = (
+    'text', 'pub_date', 'author_id', 'group_id',
+    'author__username', 'group__title',
+)
+# Поколение в ключе делает запись устаревшей сразу после изменения
+FEED_CACHE_TIMEOUT: int = 60 * 60
+
+
+class PostsFeed(Feed):
+    """Последние посты сайта в формате RSS."""
+    title = 'Yatube: последние записи'
+    description = 'Новые посты всех авторов'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def get_posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj):
+        return self.get_posts(obj).select_related('author', 'group').only(
+            *FEED_FIELDS
+        ).order_by('-pub_date', '-pk')[:FEED_SIZE]
+
+    def item_title(self, item):
+        return Truncator(item.text).words(8)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', kwargs={'post_id': item.pk})
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.username
+
+    def item_categories(self, item):
+        return [item.group.title] if item.group else []
+
+
+class GroupFeed(PostsFeed):
+    """Последние посты группы."""
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_list', kwargs={'slug': obj.slug})
+
+    def get_posts(self, obj):
+        return obj.posts.all()
+
+
+class ProfileFeed(PostsFeed):
+    """Последние посты автора."""
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: записи {obj.get_full_name() or obj.username}'
+
+    def description(self, obj):
+        return f'Новые посты автора {obj.username}'
+
+    def link(self, obj):
+        return reverse('posts:profile', kwargs={'username': obj.username})
+
+    def get_posts(self, obj):
+        return obj.posts.all()
+
+
+class AtomMixin:
+    """Та же лента в формате Atom."""
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self._get_dynamic_attr('description', obj)
+
+
+class PostsAtomFeed(AtomMixin, PostsFeed):
+    pass
+
+
+class GroupAtomFeed(AtomMixin, GroupFeed):
+    pass
+
+
+class ProfileAtomFeed(AtomMixin, ProfileFeed):
+    pass
+
+
+def cached_feed(feed, scopes_func):
+    """Представление ленты с кэшем по поколению и условными запросами."""
+    @conditional_feed(scopes_func)
+    def view(request, **kwargs):
+        if request.feed_scopes is None:
+            raise Http404
+        # Параметры запроса лента не учитывает: случайная строка запроса
+        # не должна создавать новую запись в кэше
+        key = 'feed:' + hashlib.md5('|'.join((
+            request.path, get_generation(*request.feed_scopes),
+        )).encode()).hexdigest()
+        cached = cache.get(key)
+        if cached is None:
+            response = feed(request, **kwargs)
+            # Last-Modified - время поколения, как и у ответа из кэша
+            del response['Last-Modified']
+            cache.set(
+                key,
+                (response.content, response['Content-Type']),
+                FEED_CACHE_TIMEOUT,
+            )
+            return response
+        content, content_type = cached
+        return HttpResponse(content, content_type=content_type)
+    return view
+
+
+site_rss = cached_feed(PostsFeed(), site_feed_scopes)
+site_atom = cached_feed(PostsAtomFeed(), site_feed_scopes)
+group_rss = cached_feed(GroupFeed(), group_feed_scopes)
+group_atom = cached_feed(GroupAtomFeed(), group_feed_scopes)
+profile_rss = cached_feed(ProfileFeed(), profile_feed_scopes)
+profile_atom = cached_feed(ProfileAtomFeed(), profile_feed_scopes)
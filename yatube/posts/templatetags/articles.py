@@ -0,0 +1,86 @@
+import hashlib
+
+from django import template
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from .. import images
+
+register = template.Library()
+
+ARTICLE_TEMPLATE = 'includes/article.html'
+ARTICLE_CACHE_TIMEOUT: int = 60 * 60 * 24
+# Ширина картинки на странице: во всю ширину экрана, но не шире 960px
+IMAGE_SIZES = '(max-width: 960px) 100vw, 960px'
+
+
+def post_version(post):
+    """Версия поста - отпечаток всех полей, которые выводит статья.
+
+    Правка поста, смена группы или её названия, смена имени автора дают
+    новую версию, а значит и новый ключ кэша без отдельной инвалидации.
+    """
+    author, group = post.author, post.group
+    fields = (
+        post.text, post.pub_date.isoformat(), post.image.name,
+        post.image_variants,
+        author.username, author.first_name, author.last_name,
+        group and group.slug, group and group.title,
+    )
+    return hashlib.md5(repr(fields).encode()).hexdigest()
+
+
+@register.simple_tag(takes_context=True)
+def render_articles(context, posts):
+    """Список отрисованных статей ленты; готовые фрагменты берутся из кэша.
+
+    Все фрагменты страницы запрашиваются одним cache.get_many,
+    отрисовываются и сохраняются только отсутствующие. Статьи с ещё
+    не готовой картинкой не кэшируются.
+    """
+    author, group = context.get('author'), context.get('group')
+    # Статья прячет ссылки на автора и группу на их собственных страницах
+    variant = f'{author.pk if author else ""}:{group.pk if group else ""}'
+    keys = [
+        f'article:{variant}:{post.pk}:{post_version(post)}' for post in posts
+    ]
+    fragments = cache.get_many(keys)
+    missing = {}
+    for post, key in zip(posts, keys):
+        if key not in fragments:
+            fragments[key] = get_template(ARTICLE_TEMPLATE).render(
+                {'post': post, 'author': author, 'group': group}
+            )
+            if images.PENDING_MARKER not in fragments[key]:
+                missing[key] = fragments[key]
+    if missing:
+        cache.set_many(missing, ARTICLE_CACHE_TIMEOUT)
+    return [mark_safe(fragments[key]) for key in keys]
+
+
+@register.inclusion_tag('includes/post_image.html')
+def post_image(post, lazy=True):
+    """Картинка поста со srcset из готовых вариантов.
+
+    Пока вариантов нет, выводится плейсхолдер, а их нарезка ставится
+    в фоновый пул.
+    """
+    variants = images.get_variants(post)
+    if variants is None:
+        images.schedule(post)
+        return {'pending': True}
+    name, width = variants['sources'][-1]
+    return {
+        'src': default_storage.url(name),
+        'srcset': ', '.join(
+            f'{default_storage.url(name)} {width}w'
+            for name, width in variants['sources']
+        ),
+        'sizes': IMAGE_SIZES,
+        'width': width,
+        'height': images.height(width),
+        'placeholder': variants['placeholder'],
+        'lazy': lazy,
+    }
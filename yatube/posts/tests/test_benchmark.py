@@ -0,0 +1,90 @@
+import random
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.cache import get_generation
+from posts import benchmark, seed as seeding, timeline
+from posts.bulk import rebuild_derived
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.seed import seed
+
+
+class EmptySeedTest(TestCase):
+    def test_seed_without_users_or_posts(self):
+        """Нулевые размеры не ломают генерацию зависимых объектов."""
+        seed(users=0, groups=0, posts=5, follows=5, comments=5)
+        self.assertFalse(Post.objects.exists())
+        seed(users=2, groups=0, posts=0, follows=1, comments=5)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertFalse(Comment.objects.exists())
+
+
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        seed(users=8, groups=2, posts=40, follows=12, comments=40)
+
+    def test_seed_creates_dataset(self):
+        """seed создаёт заданное число объектов и их ленты."""
+        self.assertEqual(Post.objects.count(), 40)
+        self.assertEqual(Comment.objects.count(), 40)
+        self.assertEqual(Follow.objects.count(), 12)
+        follow = Follow.objects.first()
+        self.assertEqual(
+            follow.user.timeline.count(),
+            Post.objects.filter(
+                author__following__user=follow.user
+            ).count(),
+        )
+
+    def test_seed_counts_inserted_rows(self):
+        """Пропущенные из-за уникальности строки не считаются."""
+        groups = (
+            Group(title='Группа', slug=slug, description='Описание')
+            for slug in ('seed-group-0', 'new-group')
+        )
+        created = seeding._create(Group, groups, lambda message: None)
+        self.assertEqual(created, 1)
+
+    def test_follow_pairs_capped(self):
+        """Подбор пар подписок всегда завершается."""
+        pairs = list(seeding._follow_pairs(
+            random.Random(0), [1, 2, 3], 100, 1.1
+        ))
+        self.assertEqual(len(pairs), 3)
+        self.assertEqual(len(set(pairs)), 3)
+
+    def test_rebuild_derived_keeps_cache(self):
+        """Пересчёт сбрасывает поколения, а не весь кэш с сессиями."""
+        cache.set('session-key', 'session')
+        generation = get_generation('posts')
+        rebuild_derived()
+        self.assertNotEqual(get_generation('posts'), generation)
+        self.assertEqual(cache.get('session-key'), 'session')
+
+    def test_timeline_rebuild(self):
+        """Пересборка лент повторяет ленты, собранные сигналами."""
+        Post.objects.create(
+            text='Новый пост', author=Follow.objects.first().author
+        )
+        entries = set(TimelineEntry.objects.values_list('user', 'post'))
+        timeline.rebuild()
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('user', 'post')), entries
+        )
+
+    def test_query_budget(self):
+        """Страницы укладываются в бюджет запросов к БД."""
+        results = benchmark.run(repeat=1)
+        self.assertEqual(
+            set(results), set(benchmark.load_budget()),
+            'Бюджет должен покрывать все URL posts',
+        )
+        self.assertEqual(
+            benchmark.check(
+                results, benchmark.load_budget(), metrics=('queries',)
+            ),
+            [],
+        )
@@ -0,0 +1,119 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(
+            username='TestStaff', is_staff=True
+        )
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+        cls.old_post = Post.objects.create(
+            text='Старый пост', author=cls.staff
+        )
+        Post.objects.filter(pk=cls.old_post.pk).update(
+            pub_date=timezone.now() - timedelta(days=30)
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.staff, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.staff, author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def export(self, kind, **params):
+        response = self.client.get(
+            reverse('export', kwargs={'kind': kind}), params
+        )
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_export_staff_only(self):
+        """Выгрузка доступна только персоналу."""
+        self.client.force_login(self.author)
+        response = self.client.get(
+            reverse('export', kwargs={'kind': 'posts'})
+        )
+        self.assertEqual(response.status_code, 302)
+
+    def test_export_jsonl(self):
+        """Каждая строка JSON Lines - объект с естественными ключами."""
+        rows = [
+            json.loads(line)
+            for line in self.export('posts').decode().splitlines()
+        ]
+        self.assertEqual(
+            [(row['text'], row['author'], row['group']) for row in rows],
+            [
+                ('Тестовый пост', 'TestAuthor', 'test-slug'),
+                ('Старый пост', 'TestStaff', None),
+            ],
+        )
+        follows = json.loads(self.export('follows'))
+        self.assertEqual(
+            follows, {'user': 'TestStaff', 'author': 'TestAuthor'}
+        )
+
+    def test_export_csv_gzip(self):
+        """CSV сжимается gzip на лету."""
+        content = gzip.decompress(
+            self.export('comments', format='csv', gzip='1')
+        ).decode()
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], ['id', 'post', 'author', 'text', 'created'])
+        self.assertEqual(rows[1][1:4], [
+            str(self.post.pk), 'TestStaff', 'Комментарий',
+        ])
+
+    def test_export_filters(self):
+        """Выгрузку можно ограничить датами и автором."""
+        day = timezone.localdate() - timedelta(days=1)
+        for params, expected in (
+            ({'since': day.isoformat()}, ['Тестовый пост']),
+            ({'until': day.isoformat()}, ['Старый пост']),
+            ({'author': 'TestStaff'}, ['Старый пост']),
+        ):
+            with self.subTest(params=params):
+                rows = self.export('posts', **params).decode().splitlines()
+                self.assertEqual(
+                    [json.loads(row)['text'] for row in rows], expected
+                )
+        response = self.client.get(
+            reverse('export', kwargs={'kind': 'posts'}), {'since': 'вчера'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_command(self):
+        """Команда export пишет выгрузку в файл."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'groups.jsonl.gz')
+            call_command('export', 'groups', '--gzip', '--output', path)
+            with gzip.open(path, 'rt', encoding='utf-8') as export_file:
+                rows = [json.loads(line) for line in export_file]
+        self.assertEqual([row['slug'] for row in rows], ['test-slug'])
@@ -15,10 +15,13 @@ User = get_user_model()
 # на момент теста медиа папка будет переопределена
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
+# Картинка перекодируется в JPEG и хранится под хешем содержимого
+STORED_IMAGE_NAME = r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$'
+
 
 # Для сохранения media-файлов в тестах будет использоваться
 # временная папка TEMP_MEDIA_ROOT, а потом мы ее удалим
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_WORKERS=0)
 class PostCreateFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -101,9 +104,7 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(
             self.create_post.author.username, self.author.username
         )
-        self.assertEqual(
-            self.create_post.image, 'posts/small.gif'
-        )
+        self.assertRegex(self.create_post.image.name, STORED_IMAGE_NAME)
 
     def test_post_edit(self):
         """Валидная форма редактирует запись в Post."""
@@ -148,7 +149,7 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(self.edit_post.text, form_data['text'])
         self.assertEqual(self.edit_post.group.id, self.group_edit.id)
         self.assertEqual(self.edit_post.author.username, self.author.username)
-        self.assertEqual(self.edit_post.image, 'posts/small_edit.gif')
+        self.assertRegex(self.edit_post.image.name, STORED_IMAGE_NAME)
 
 
 class CommentCreateFormTests(TestCase):
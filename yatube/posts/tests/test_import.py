@@ -0,0 +1,116 @@
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.importer import Importer
+from posts.models import AuthorStats, Comment, Group, Post
+from search.backends import POST, get_backend
+
+User = get_user_model()
+
+
+class ImportPostsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.directory = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as import_file:
+            import_file.write(content)
+        return path
+
+    def import_posts(self, *args):
+        stderr = io.StringIO()
+        call_command(
+            'import_posts', *args, stdout=io.StringIO(), stderr=stderr
+        )
+        return stderr.getvalue()
+
+    def test_import_jsonl(self):
+        """Посты и комментарии связываются по id из файлов."""
+        rows = (
+            {'id': 7, 'text': 'Пост в группе', 'author': 'TestAuthor',
+             'group': 'test-slug', 'pub_date': '2021-05-01T10:00:00'},
+            {'id': 8, 'text': 'Пост новой группы', 'author': 'TestAuthor',
+             'group': 'new-slug', 'image': ''},
+        )
+        posts = self.write(
+            'posts.jsonl', '\n'.join(json.dumps(row) for row in rows)
+        )
+        comments = self.write('comments.jsonl', json.dumps(
+            {'post': 7, 'author': 'TestAuthor', 'text': 'Комментарий'}
+        ))
+        self.import_posts(posts, '--comments', comments)
+        post = Post.objects.get(text='Пост в группе')
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.pub_date.year, 2021)
+        self.assertEqual(
+            Post.objects.get(text='Пост новой группы').group.slug, 'new-slug'
+        )
+        self.assertEqual(Comment.objects.get().post, post)
+
+    def test_import_rebuilds_derived_data(self):
+        """После загрузки пересчитаны счётчики и поисковый индекс."""
+        posts = self.write(
+            'posts.csv',
+            'text,author,group\nПервый импорт,TestAuthor,\n'
+            'Второй импорт,TestAuthor,test-slug\n',
+        )
+        self.import_posts(posts)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 2
+        )
+        hits = get_backend().search('импорт', 10, kinds=(POST,))
+        self.assertEqual(len(hits), 2)
+
+    def test_import_skips_bad_rows(self):
+        """Ошибочные строки пропускаются и попадают в отчёт."""
+        posts = self.write('posts.jsonl', '\n'.join((
+            json.dumps({'text': 'Хороший', 'author': 'TestAuthor'}),
+            json.dumps({'text': 'Чужой', 'author': 'Nobody'}),
+            '{оборванная строка',
+            json.dumps({'text': '', 'author': 'TestAuthor'}),
+        )))
+        errors = self.import_posts(posts)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Хороший']
+        )
+        self.assertIn('строка 2: нет пользователя Nobody', errors)
+        self.assertIn('строка 3', errors)
+        self.assertIn('строка 4: пустой текст', errors)
+
+    def test_import_creates_authors(self):
+        """С --create-authors недостающие пользователи создаются."""
+        posts = self.write(
+            'posts.jsonl',
+            json.dumps({'text': 'Новый автор', 'author': 'NewAuthor'}),
+        )
+        self.import_posts(posts, '--create-authors')
+        author = Post.objects.get().author
+        self.assertEqual(author.username, 'NewAuthor')
+        self.assertFalse(author.has_usable_password())
+
+    def test_importer_logs_to_module_logger(self):
+        """Без log ход загрузки пишется в журнал, а не в stdout."""
+        records = [(1, {'text': 'Пост', 'author': 'TestAuthor'})]
+        with self.assertLogs('posts.importer', 'INFO') as logs:
+            self.assertEqual(Importer().import_posts(records), 1)
+        self.assertTrue(logs.output)
@@ -0,0 +1,99 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.paginator import CursorPaginator
+from posts.feeds import COMMENT_ORDERING
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Полный перебор таблицы: SCAN без индекса
+FULL_SCAN_RE = re.compile(r'^SCAN (TABLE )?\w+$')
+
+
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='TestReader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(15):
+            post = Post.objects.create(
+                text=f'Тестовый пост {number}',
+                author=cls.author,
+                group=cls.group,
+            )
+        Comment.objects.create(
+            post=post, author=cls.reader, text='Тестовый комментарий'
+        )
+        cls.post = post
+        cls.cursor = CursorPaginator(
+            Post.objects.all(), 10
+        ).encode_cursor(post)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def explain(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_views_use_indexes(self):
+        """Запросы страниц не перебирают таблицы целиком."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + f'?cursor={self.cursor}',
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(url)
+                self.assertTrue(queries.captured_queries)
+                for query in queries.captured_queries:
+                    sql = query['sql']
+                    if not sql.startswith('SELECT'):
+                        continue
+                    # Журнал запросов хранит SQL с подставленными
+                    # значениями, поэтому план строится по нему
+                    for step in self.explain(sql, ()):
+                        self.assertIsNone(
+                            FULL_SCAN_RE.match(step), f'{step}: {sql}'
+                        )
+
+    def test_feeds_are_read_in_index_order(self):
+        """Ленты читаются в порядке индекса, без сортировки."""
+        feed_order = ('-pub_date', '-pk')
+        querysets = {
+            'index': Post.objects.order_by(*feed_order),
+            'group': self.group.posts.order_by(*feed_order),
+            'profile': self.author.posts.order_by(*feed_order),
+            'comments': self.post.comments.order_by(*COMMENT_ORDERING),
+        }
+        for name, queryset in querysets.items():
+            with self.subTest(feed=name):
+                sql, params = queryset[:11].query.sql_with_params()
+                plan = self.explain(sql, params)
+                self.assertFalse(
+                    [step for step in plan if 'TEMP B-TREE' in step], plan
+                )
+                self.assertTrue(
+                    [step for step in plan if 'INDEX' in step], plan
+                )
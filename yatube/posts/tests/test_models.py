@@ -1,7 +1,12 @@
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DatabaseError
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import AuthorStats, Follow, Group, Post
 
 User = get_user_model()
 
@@ -43,3 +48,60 @@ class PostModelTest(TestCase):
             with self.subTest(value=value):
                 response = self.post._meta.get_field(value).help_text
                 self.assertEqual(response, expected)
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='TestReader')
+
+    def assertStats(self, user, posts, followers, following):
+        stats = AuthorStats.objects.get(user=user)
+        self.assertEqual(
+            (stats.posts_count, stats.followers_count, stats.following_count),
+            (posts, followers, following),
+        )
+
+    def test_counters_follow_posts_and_follows(self):
+        """Счётчики меняются вместе с постами и подписками."""
+        post = Post.objects.create(text='Тестовый пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertStats(self.author, 1, 1, 0)
+        self.assertStats(self.reader, 0, 0, 1)
+        post.delete()
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertStats(self.author, 0, 0, 0)
+        self.assertStats(self.reader, 0, 0, 0)
+
+    def test_failed_update_rolls_back_counters(self):
+        """Если ленту обновить не удалось, не меняются и счётчики."""
+        with mock.patch(
+            'posts.timeline.fan_out_post', side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                Post.objects.create(text='Тестовый пост', author=self.author)
+        with mock.patch(
+            'posts.timeline.follow_added', side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                Follow.objects.create(user=self.reader, author=self.author)
+        self.assertFalse(Post.objects.filter(author=self.author).exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(AuthorStats.objects.exists())
+
+    def test_reconcile_stats_fixes_drift(self):
+        """Команда reconcile_stats исправляет расхождения счётчиков."""
+        Post.objects.bulk_create([
+            Post(text='Тестовый пост', author=self.author) for _ in range(3)
+        ])
+        Follow.objects.create(user=self.reader, author=self.author)
+        AuthorStats.objects.filter(user=self.reader).delete()
+        out = StringIO()
+        call_command('reconcile_stats', stdout=out)
+        self.assertEqual(out.getvalue().splitlines(), [
+            'Исправлено записей статистики: 2',
+            'Авторов с раскладкой в ленты: 0',
+        ])
+        self.assertStats(self.author, 3, 1, 0)
+        self.assertStats(self.reader, 0, 0, 1)
@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from posts import images, media
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_GIF = SMALL_GIF[:-3] + b'\x0A\x01\x3B'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_WORKERS=0)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # У каждого теста своя папка: сборка мусора видит только его файлы
+        media_root = override_settings(
+            MEDIA_ROOT=tempfile.mkdtemp(dir=TEMP_MEDIA_ROOT)
+        )
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+    def create_post(self, content, name='meme.gif'):
+        post = Post(text='Пост с картинкой', author=self.author)
+        post.image.save(name, ContentFile(content), save=False)
+        post.save()
+        return post
+
+    def test_same_content_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом, разные - разными."""
+        first = self.create_post(SMALL_GIF)
+        second = self.create_post(SMALL_GIF, name='repost.GIF')
+        other = self.create_post(OTHER_GIF)
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(os.listdir(directory), [
+            os.path.basename(first.image.name)
+        ])
+        with first.image.open() as file_:
+            self.assertEqual(file_.read(), SMALL_GIF)
+
+    def test_variants_built_once_per_image(self):
+        """Варианты общей картинки нарезаются один раз на все посты."""
+        posts = [self.create_post(SMALL_GIF) for _ in range(3)]
+        with mock.patch('posts.images.build', wraps=images.build) as build:
+            for post in posts:
+                images.build_for_image(post.image.name)
+        build.assert_called_once()
+        for post in Post.objects.filter(pk__in=[p.pk for p in posts]):
+            self.assertIsNotNone(images.get_variants(post))
+
+    def test_collect_garbage(self):
+        """Удаляются только файлы, на которые не ссылается ни один пост."""
+        kept = self.create_post(SMALL_GIF)
+        self.create_post(SMALL_GIF)
+        orphan = self.create_post(OTHER_GIF)
+        for post in (kept, orphan):
+            images.build_for_image(post.image.name)
+        orphan = Post.objects.get(pk=orphan.pk)
+        orphan_files = [orphan.image.name] + [
+            name for name, _ in images.get_variants(orphan)['sources']
+        ]
+        orphan.delete()
+        # Свежие файлы не трогаем: их пост может быть ещё не сохранён
+        self.assertEqual(media.collect_garbage()[0], 0)
+        removed, freed = media.collect_garbage(min_age=0)
+        self.assertEqual(removed, len(orphan_files))
+        self.assertGreater(freed, 0)
+        self.assertFalse(orphan.image.storage.exists(orphan_files[0]))
+        self.assertFalse(default_storage.exists(orphan_files[1]))
+        self.assertTrue(kept.image.storage.exists(kept.image.name))
+        self.assertEqual(media.references()[kept.image.name], 2)
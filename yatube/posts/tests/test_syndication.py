@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class SyndicationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Пост в группе', author=cls.author, group=cls.group
+        )
+        cls.other_post = Post.objects.create(
+            text='Пост без группы', author=cls.author
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_content(self):
+        """Ленты сайта, группы и автора содержат свои посты."""
+        for name, kwargs, expected, excluded in (
+            ('posts:site_rss', {}, ['Пост в группе', 'Пост без группы'], []),
+            ('posts:group_atom', {'slug': 'test-slug'},
+             ['Пост в группе'], ['Пост без группы']),
+            ('posts:profile_rss', {'username': 'TestAuthor'},
+             ['Пост в группе', 'Пост без группы'], []),
+        ):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, kwargs=kwargs))
+                self.assertEqual(response.status_code, 200)
+                for text in expected:
+                    self.assertContains(response, text)
+                for text in excluded:
+                    self.assertNotContains(response, text)
+        response = self.client.get(reverse('posts:site_atom'))
+        self.assertEqual(
+            response['Content-Type'], 'application/atom+xml; charset=utf-8'
+        )
+        response = self.client.get(
+            reverse('posts:group_rss', kwargs={'slug': 'nonexistent'})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_feed_cached_and_conditional(self):
+        """Повторный запрос - из кэша или 304, новый пост сбрасывает кэш."""
+        url = reverse('posts:site_rss')
+        response = self.client.get(url)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        # Last-Modified точен до секунды, поэтому изменение в ту же
+        # секунду видно по ETag
+        Post.objects.create(text='Совсем новый пост', author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Совсем новый пост')
+
+    def test_query_string_ignored(self):
+        """Строка запроса не создаёт новых записей кэша и ETag."""
+        url = reverse('posts:site_rss')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'nocache': '1'})
+        self.assertEqual(response['ETag'], etag)
+
+    def test_author_rename_changes_feed(self):
+        """Новое имя автора сбрасывает кэш ленты сайта и группы."""
+        for name, kwargs in (
+            ('posts:site_rss', {}),
+            ('posts:group_atom', {'slug': 'test-slug'}),
+        ):
+            with self.subTest(name=name):
+                url = reverse(name, kwargs=kwargs)
+                etag = self.client.get(url)['ETag']
+                self.author.username = f'Renamed{len(kwargs)}'
+                self.author.save()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, self.author.username)
@@ -0,0 +1,95 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post
+from posts.uploads import LimitedUploadHandler
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_file(size, format_='JPEG', noise=False, **params):
+    if noise:
+        image = Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+    else:
+        image = Image.new('RGB', size, (200, 30, 30))
+    buffer = io.BytesIO()
+    image.save(buffer, format_, **params)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_WORKERS=0)
+class ImageUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def post_image(self, content, name='image.jpg'):
+        return self.author_client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile(name, content, 'image/jpeg'),
+        })
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=1024)
+    def test_large_file_rejected(self):
+        """Файл больше предела отклоняется с понятной ошибкой."""
+        response = self.post_image(image_file((64, 64), noise=True))
+        self.assertFormError(
+            response, 'form', 'image',
+            'Слишком большой файл, допустимо не больше 1,0\xa0КБ',
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_pixel_limit_checked_by_header(self):
+        """Число пикселей проверяется по первому куску файла."""
+        content = image_file((20, 20), 'PNG')
+        handler = LimitedUploadHandler()
+        handler.new_file('image', 'image.png', 'image/png', len(content))
+        self.assertIsNone(handler.receive_data_chunk(content[:64], 0))
+        self.assertIn('20x20', handler.reason)
+        rejected = handler.file_complete(64)
+        self.assertEqual(rejected.reason, handler.reason)
+        response = self.post_image(content, 'image.png')
+        self.assertIn('20x20', response.context['form'].errors['image'][0])
+
+    @override_settings(IMAGE_MAX_SIDE=500)
+    def test_image_normalized(self):
+        """Картинка уменьшается, поворачивается по EXIF и теряет EXIF."""
+        exif = Image.Exif()
+        # Ориентация 6: камера повёрнута, картинку надо повернуть на 90°
+        exif[0x0112] = 6
+        content = image_file((3000, 1000), exif=exif.tobytes())
+        response = self.post_image(content, 'photo.jpeg')
+        self.assertEqual(response.status_code, 302)
+        post = Post.objects.get()
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (167, 500))
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_not_an_image_rejected(self):
+        """Не картинка отклоняется проверкой ImageField."""
+        response = self.post_image(b'not an image ' * 100)
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
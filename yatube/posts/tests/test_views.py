@@ -1,15 +1,27 @@
+import base64
+import json
 import shutil
 import tempfile
+import time
+from http import HTTPStatus
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.models import Comment, Follow, Group, Post
+from core.cache import get_generation
+from core.paginator import CursorPaginator
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts import executor, images, timeline
+from posts.templatetags.articles import post_version
+from posts.images import PENDING_MARKER
 
 User = get_user_model()
 
@@ -19,7 +31,7 @@ POSTS_COUNT = 1
 POSTS_FOLLOW_COUNT = 1
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_WORKERS=0)
 class MyViewsTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -54,6 +66,8 @@ class MyViewsTest(TestCase):
             text='Тестовый пост',
             image=cls.uploaded,
         )
+        images.build_for_image(cls.post.image.name)
+        cls.post.refresh_from_db()
         cls.commenter = User.objects.create_user(username='TestCommenter')
         cls.comments = Comment.objects.create(
             post=cls.post,
@@ -68,6 +82,8 @@ class MyViewsTest(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        # Кэш лент живёт дольше одного теста - начинаем с чистого
+        cache.clear()
         # Создаем авторизованый клиент автора
         self.author_client = Client()
         self.author_client.force_login(self.author)
@@ -143,6 +159,21 @@ class PostPagesTest(MyViewsTest):
         )
         self.assertEqual(response.context['post'].comments, self.post.comments)
 
+    def test_counters_without_aggregate_queries(self):
+        """Счётчики профиля и поста не требуют COUNT-запросов."""
+        urls = (
+            reverse('posts:profile', kwargs={'username': 'TestAuthorName'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        )
+        for url_path in urls:
+            with self.subTest(url_path=url_path):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url_path)
+                self.assertEqual(response.context['posts_count'], POSTS_COUNT)
+                self.assertFalse(any(
+                    'COUNT(' in query['sql'] for query in queries
+                ))
+
     def test_create_edit_pages_show_correct_context(self):
         """Шаблон create и edit сформирован с правильным контекстом."""
 
@@ -208,15 +239,203 @@ class PostPagesTest(MyViewsTest):
         cache.clear()
         response_cache = self.client.get(reverse('posts:index'))
         cache_check = response_cache.content
-        post = Post.objects.latest('pub_date')
-        post.delete()
-        response_delete = self.client.get(reverse('posts:index'))
-        self.assertEqual(response_delete.content, cache_check)
+        # update() не отправляет сигналы, поколение кэша не меняется
+        Post.objects.filter(pk=self.post.pk).update(text='Изменённый пост')
+        response_update = self.client.get(reverse('posts:index'))
+        self.assertEqual(response_update.content, cache_check)
+
+    def test_article_fragment_cache(self):
+        """Статья кэшируется по версии поста, правка меняет версию."""
+        post = Post.objects.select_related('author', 'group').get(
+            pk=self.post.pk
+        )
+        version = post_version(post)
+        self.client.get(reverse('posts:index'))
+        self.assertIn(
+            post.text, cache.get(f'article:::{post.pk}:{version}')
+        )
+        post.group = self.group_2
+        post.save()
+        self.assertNotEqual(post_version(post), version)
+
+    def test_conditional_get(self):
+        """Повторный запрос без изменений получает 304."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug_1'}),
+            reverse('posts:profile', kwargs={'username': 'TestAuthorName'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        )
+        for url_path in urls:
+            with self.subTest(url_path=url_path):
+                response = self.client.get(url_path)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                not_modified = self.client.get(
+                    url_path, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(
+                    not_modified.status_code, HTTPStatus.NOT_MODIFIED
+                )
+                not_modified = self.client.get(
+                    url_path,
+                    HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+                )
+                self.assertEqual(
+                    not_modified.status_code, HTTPStatus.NOT_MODIFIED
+                )
+                # Другой пользователь получает свою версию страницы
+                response_author = self.author_client.get(
+                    url_path, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(response_author.status_code, HTTPStatus.OK)
+                self.assertFalse(response_author.has_header('Last-Modified'))
+
+    def test_conditional_get_after_comment(self):
+        """Новый комментарий меняет ETag страницы поста."""
+        url_path = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}
+        )
+        response = self.client.get(url_path)
+        Comment.objects.create(
+            post=self.post, author=self.commenter, text='Новый комментарий'
+        )
+        response_new = self.client.get(
+            url_path, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response_new.status_code, HTTPStatus.OK)
+        self.assertContains(response_new, 'Новый комментарий')
+
+    def test_author_rename_changes_feeds(self):
+        """Новое имя автора видно в общих лентах, вход их не сбрасывает."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug_1'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        )
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        self.client.force_login(self.commenter)
+        self.client.logout()
+        for url_path in urls:
+            with self.subTest(url_path=url_path, changed=False):
+                response = self.client.get(
+                    url_path, HTTP_IF_NONE_MATCH=etags[url_path]
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+        self.author.first_name = 'Переименованный'
+        self.author.save()
+        for url_path in urls:
+            with self.subTest(url_path=url_path, changed=True):
+                response = self.client.get(
+                    url_path, HTTP_IF_NONE_MATCH=etags[url_path]
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertContains(response, 'Переименованный')
+
+    def test_image_variants_generated_in_background(self):
+        """Пока вариантов картинки нет, выводится плейсхолдер."""
+        Post.objects.filter(pk=self.post.pk).update(image_variants='')
+        url_path = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}
+        )
+        with mock.patch('posts.images.schedule') as schedule:
+            response = self.client.get(url_path)
+        schedule.assert_called_once()
+        self.assertContains(response, PENDING_MARKER)
+        self.assertNotContains(response, '<img class="card-img')
+        # Без рабочих потоков варианты создаются сразу
+        images.schedule(self.post)
+        response = self.client.get(url_path)
+        self.assertNotContains(response, PENDING_MARKER)
+        self.assertContains(response, 'srcset="/media/variants/')
+        self.assertContains(response, 'data:image/jpeg;base64,')
+
+    @override_settings(BACKGROUND_QUEUE_LIMIT=0)
+    def test_full_queue_drops_task(self):
+        """Задача сверх предела очереди отбрасывается."""
+        task = mock.Mock()
+        self.assertFalse(executor.submit(('test', 'task'), task))
+        task.assert_not_called()
+
+    def test_image_variants_invalidate_only_their_posts(self):
+        """Новые варианты сбрасывают кэш только постов с картинкой."""
+        Post.objects.filter(pk=self.post.pk).update(image_variants='')
+        scopes = (f'post:{self.post.pk}', f'group:{self.group_1.pk}')
+        before = get_generation(*scopes)
+        other_before = get_generation(f'group:{self.group_2.pk}')
+        self.assertEqual(images.build_for_image(self.post.image.name), 1)
+        self.assertNotEqual(get_generation(*scopes), before)
+        self.assertEqual(
+            get_generation(f'group:{self.group_2.pk}'), other_before
+        )
+
+    def test_failed_image_variants_retried_with_backoff(self):
+        """Неудачная нарезка не повторяется при каждом показе поста."""
+        Post.objects.filter(pk=self.post.pk).update(image_variants='')
+        url_path = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}
+        )
+        with mock.patch('posts.images.build', side_effect=OSError) as build:
+            with self.assertLogs('posts.executor', 'ERROR'):
+                self.client.get(url_path)
+            self.client.get(url_path)
+            self.assertEqual(build.call_count, 1)
+            retry = time.time() + images.RETRY_DELAY + 1
+            with mock.patch('time.time', return_value=retry):
+                with self.assertLogs('posts.executor', 'ERROR'):
+                    self.client.get(url_path)
+            self.assertEqual(build.call_count, 2)
+
+    def test_image_variants_ignored_after_image_change(self):
+        """Варианты прежней картинки не выводятся и не сохраняются."""
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertIsNotNone(images.get_variants(post))
+        post.image.name = 'posts/other.gif'
+        self.assertIsNone(images.get_variants(post))
+        Post.objects.filter(pk=post.pk).update(image='posts/other.gif')
+        self.assertFalse(
+            images.build_for_image(self.post.image.name)
+        )
+
+    def test_cache_invalidated_on_post_save(self):
+        """Сохранение поста сбрасывает кэш только затронутых лент."""
+        other_author = User.objects.create_user(username='TestOtherAuthor')
+        other_post = Post.objects.create(
+            author=other_author, text='Пост другого автора'
+        )
+        urls = {
+            reverse('posts:index'): True,
+            reverse('posts:group_list', kwargs={'slug': 'test-slug_1'}): True,
+            reverse('posts:profile', kwargs={'username': 'TestAuthorName'}):
+                True,
+            reverse('posts:profile', kwargs={'username': 'TestOtherAuthor'}):
+                False,
+        }
+        cache.clear()
+        for url_path in urls:
+            self.client.get(url_path)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Отредактированный пост'
+        post.save()
+        # Правка в обход сигналов видна только на сброшенных страницах
+        Post.objects.filter(pk=other_post.pk).update(text='Тихая правка')
+        for url_path, invalidated in urls.items():
+            with self.subTest(url_path=url_path):
+                response = self.client.get(url_path)
+                if invalidated:
+                    self.assertContains(response, 'Отредактированный пост')
+                self.assertEqual(
+                    'Тихая правка' in response.content.decode(),
+                    invalidated and url_path == reverse('posts:index'),
+                )
 
     def test_cache_clear_index_page(self):
         """Пост на главной странице пропадает после очисти кеша."""
+        cache.clear()
         response_cache = self.client.get(reverse('posts:index'))
         cache_check = response_cache.content
+        Post.objects.latest('pub_date').delete()
         cache.clear()
         response_clear = self.client.get(reverse('posts:index'))
         self.assertNotEqual(response_clear.content, cache_check)
@@ -242,18 +461,169 @@ class PaginatorViewsTest(MyViewsTest):
             reverse('posts:group_list', kwargs={'slug': 'test-slug_1'}),
             reverse('posts:profile', kwargs={'username': 'TestAuthorName'}),
         )
-        pages_paginator = (
-            (1, POSTS_ON_PAGE_1),
-            (2, POSTS_ON_PAGE_2),
-        )
         for url_path in url_for_paginator:
-            for page_number, posts_count in pages_paginator:
-                with self.subTest(url_path=url_path, page=page_number):
-                    response = self.client.get(
-                        url_path, {'page': page_number}
-                    ).context['page_obj']
+            with self.subTest(url_path=url_path):
+                cache.clear()
+                first_page = self.client.get(url_path).context['page_obj']
+                self.assertEqual(len(first_page), POSTS_ON_PAGE_1)
+                self.assertIsNone(first_page.paginator.previous_cursor)
+
+                cache.clear()
+                second_page = self.client.get(
+                    url_path, {'cursor': first_page.paginator.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second_page), POSTS_ON_PAGE_2)
+                self.assertIsNone(second_page.paginator.next_cursor)
+                # Страницы не пересекаются и идут по убыванию даты
+                self.assertTrue(
+                    set(first_page).isdisjoint(set(second_page))
+                )
+                self.assertGreater(
+                    first_page[-1].pub_date, second_page[0].pub_date
+                )
 
-                    self.assertEqual(len(response), posts_count)
+                cache.clear()
+                previous_page = self.client.get(
+                    url_path, {'cursor': second_page.paginator.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(previous_page), list(first_page))
+                self.assertIsNone(previous_page.paginator.previous_cursor)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        """Число запросов страницы ленты не растёт с числом постов."""
+        other_author = User.objects.create_user(username='TestOtherAuthor')
+        for post_number in range(24):
+            Post.objects.create(
+                author=(self.author, other_author)[post_number % 2],
+                group=(self.group_1, self.group_2, None)[post_number % 3],
+                text=f'Тестовый пост_{post_number}',
+            )
+        for author in (self.author, other_author):
+            Follow.objects.create(user=self.commenter, author=author)
+        client = Client()
+        client.force_login(self.commenter)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug_1'}),
+            reverse('posts:profile', kwargs={'username': 'TestAuthorName'}),
+            reverse('posts:follow_index'),
+        )
+        for url_path in urls:
+            with self.subTest(url_path=url_path):
+                counts = []
+                for page_size in (2, 8):
+                    cache.clear()
+                    with mock.patch('posts.views.POST_COUNT', page_size):
+                        with CaptureQueriesContext(connection) as queries:
+                            response = client.get(url_path)
+                    self.assertEqual(
+                        len(response.context['page_obj']), page_size
+                    )
+                    counts.append(len(queries))
+                self.assertEqual(counts[0], counts[1])
+
+    def test_comments_paginated(self):
+        """Комментарии выводятся страницами и догружаются отдельно."""
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=self.commenter, text=f'Ком_{n}')
+            for n in range(24)
+        ])
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        first_page = response.context['comments']
+        self.assertEqual(len(first_page), 20)
+        self.assertEqual(first_page[0], self.comments)
+        cursor = first_page.paginator.next_cursor
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        response = self.client.get(url, {'cursor': cursor})
+        self.assertTemplateUsed(response, 'includes/comment_list.html')
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertContains(response, 'Ком_23')
+        self.assertNotContains(response, 'Показать ещё')
+        data = self.client.get(
+            url, {'cursor': cursor, 'format': 'json'}
+        ).json()
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']],
+            [f'Ком_{n}' for n in range(19, 24)],
+        )
+        self.assertIsNone(data['next_cursor'])
+
+    def test_comments_query_count_does_not_depend_on_page_size(self):
+        """Число запросов страницы поста не растёт с числом комментариев."""
+        for number in range(8):
+            Comment.objects.create(
+                post=self.post,
+                author=User.objects.create_user(username=f'TestUser{number}'),
+                text='Комментарий',
+            )
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        # Первый запрос создаёт миниатюру картинки поста
+        self.client.get(url)
+        counts = []
+        for page_size in (2, 8):
+            with mock.patch('posts.views.COMMENT_COUNT', page_size):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+            self.assertEqual(len(response.context['comments']), page_size)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Некорректный курсор открывает первую страницу."""
+        response = self.client.get(
+            reverse('posts:index'), {'cursor': 'not-a-cursor'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+    def test_tampered_cursor_returns_first_page(self):
+        """Курсор с подменёнными значениями открывает первую страницу."""
+        for position in (
+            ['not-a-date', 1], [{'a': 1}, 1], ['2020-01-01', 'x'],
+            [None, 1], [[], 1], ['2020-01-01T00:00:00+00:00', 10 ** 30],
+        ):
+            cursor = base64.urlsafe_b64encode(
+                json.dumps({'p': position, 'r': False}).encode()
+            ).decode()
+            for url in (reverse('posts:index'), reverse('api:post_list')):
+                with self.subTest(position=position, url=url):
+                    response = self.client.get(url, {'cursor': cursor})
+                    self.assertEqual(response.status_code, 200)
+
+    def test_huge_integer_cursor_returns_first_page(self):
+        """Целое вне диапазона базы в курсоре открывает первую страницу."""
+        huge = 10 ** 30
+        urls = (
+            (reverse('posts:index'), ['2020-01-01T00:00:00+00:00', huge]),
+            (reverse('api:post_list'), ['2020-01-01T00:00:00+00:00', huge]),
+            (reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+             ['2020-01-01T00:00:00+00:00', huge]),
+            (reverse('api:group_list'), [huge]),
+        )
+        for url, position in urls:
+            cursor = base64.urlsafe_b64encode(
+                json.dumps({'p': position, 'r': False}).encode()
+            ).decode()
+            with self.subTest(url=url):
+                response = self.client.get(url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+
+    def test_offset_paging_disabled(self):
+        """Счёт страниц и выбор по номеру недоступны."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        page = paginator.get_page(None)
+        self.assertIsNone(page.number)
+        self.assertIsNone(paginator.next_cursor)
+        for member in ('count', 'num_pages', 'page_range'):
+            with self.subTest(member=member):
+                with self.assertRaises(NotImplementedError):
+                    getattr(paginator, member)
+        with self.assertRaises(NotImplementedError):
+            paginator.page(2)
+        with self.assertRaises(NotImplementedError):
+            page.has_next()
 
 
 class FollowsViewsTest(TestCase):
@@ -340,3 +710,83 @@ class FollowsViewsTest(TestCase):
         )
         # Проверяем, уменьшилось ли количество подписок
         self.assertEqual(Follow.objects.count(), follow_count - 1)
+
+    def test_unfollow_removes_posts_from_feed(self):
+        """После отписки посты автора пропадают из ленты."""
+        self.follower_client.get(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': 'TestAuthorNameNew'}
+            )
+        )
+        self.assertFalse(self.follower.timeline.exists())
+        response = self.follower_client.get(reverse('posts:follow_index'))
+        self.assertNotContains(response, self.post_new.text)
+
+    def test_popular_author_read_on_fan_in(self):
+        """Посты популярного автора дочитываются в ленту при выдаче."""
+        with mock.patch('posts.timeline.FAN_OUT_LIMIT', 2):
+            Follow.objects.create(
+                user=self.no_follower, author=self.author_new
+            )
+            post = Post.objects.create(
+                author=self.author_new, text='Пост популярного автора'
+            )
+            self.assertFalse(
+                TimelineEntry.objects.filter(post=post).exists()
+            )
+            for client in (self.follower_client, self.no_follower_client):
+                with self.subTest(client=client):
+                    response = client.get(reverse('posts:follow_index'))
+                    self.assertEqual(
+                        list(response.context['page_obj']),
+                        [post, self.post_new],
+                    )
+
+    def test_feed_read_by_timeline_index(self):
+        """Лента сортируется по дате из записей ленты, а не постов."""
+        entry = TimelineEntry.objects.get(
+            user=self.follower, post=self.post_new
+        )
+        self.assertEqual(entry.pub_date, self.post_new.pub_date)
+        posts = [
+            Post.objects.create(author=self.author_new, text=f'Пост {i}')
+            for i in range(12)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.follower_client.get(
+                reverse('posts:follow_index')
+            )
+        self.assertTrue(any(
+            '"posts_timelineentry"."pub_date" AS "timeline_date"'
+            in query['sql'] and 'ORDER BY "timeline_date" DESC' in query['sql']
+            for query in queries
+        ))
+        self.assertEqual(
+            list(response.context['page_obj']), posts[::-1][:10]
+        )
+        response = self.follower_client.get(
+            reverse('posts:follow_index'),
+            {'cursor': response.context['page_obj'].paginator.next_cursor},
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            posts[1::-1] + [self.post_new],
+        )
+
+    def test_unfollow_keeps_fan_in_until_rebalance(self):
+        """Отписка не возвращает раскладку сразу - это делает rebalance."""
+        with mock.patch('posts.timeline.FAN_OUT_LIMIT', 2), \
+                mock.patch('posts.timeline.FAN_OUT_RESUME_LIMIT', 2):
+            follow = Follow.objects.create(
+                user=self.no_follower, author=self.author_new
+            )
+            follow.delete()
+            self.assertFalse(
+                Follow.objects.get(pk=self.follow.pk).fan_out
+            )
+            self.assertEqual(timeline.rebalance(), 1)
+        self.assertTrue(Follow.objects.get(pk=self.follow.pk).fan_out)
+        self.assertTrue(
+            self.follower.timeline.filter(post=self.post_new).exists()
+        )
@@ -0,0 +1,170 @@
+"""Материализованные ленты подписок (fan-out on write).
+
+Новый пост раскладывается в ленты подписчиков автора при записи, поэтому
+чтение ленты - выборка по индексу без соединения с подписками. Посты
+популярных авторов (не меньше FAN_OUT_LIMIT подписчиков) не раскладываются:
+такие подписки помечены fan_out=False и дочитываются при чтении ленты.
+
+Обратно к раскладке автор возвращается, только когда подписчиков стало
+меньше FAN_OUT_RESUME_LIMIT, и не при отписке, а в rebalance (команда
+reconcile_stats): так отписки у границы не вызывают повторных
+наполнений лент сотен подписчиков.
+"""
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+# Число подписчиков, начиная с которого посты автора читаются "на лету"
+FAN_OUT_LIMIT: int = 1000
+# Число подписчиков, ниже которого раскладка при записи возвращается
+FAN_OUT_RESUME_LIMIT: int = 800
+# Сколько последних постов автора добавить в ленту при подписке
+BACKFILL_COUNT: int = 1000
+BATCH_SIZE: int = 500
+# Порядок ленты для CursorPaginator: аннотации get_timeline
+TIMELINE_ORDERING = ('-timeline_date', '-timeline_post')
+
+
+def _bulk_add(entries):
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Добавляет новый пост в ленты подписчиков автора."""
+    followers = (
+        Follow.objects.filter(author_id=post.author_id, fan_out=True)
+        .values_list('user_id', flat=True)
+    )
+    entries = []
+    for user_id in followers.iterator():
+        entries.append(TimelineEntry(
+            user_id=user_id, post_id=post.pk, pub_date=post.pub_date
+        ))
+        if len(entries) >= BATCH_SIZE:
+            _bulk_add(entries)
+            entries = []
+    _bulk_add(entries)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты автора."""
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .values_list('pk', 'pub_date')[:BACKFILL_COUNT]
+    )
+    _bulk_add([
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts
+    ])
+
+
+def _followers_count(author_id):
+    return AuthorStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first() or 0
+
+
+@transaction.atomic
+def follow_added(follow):
+    """Наполняет ленту после подписки на автора."""
+    author_id = follow.author_id
+    fan_in = Follow.objects.filter(author_id=author_id, fan_out=False)
+    if _followers_count(author_id) >= FAN_OUT_LIMIT or fan_in.exists():
+        # Автор популярен: его посты читаются при выдаче ленты
+        Follow.objects.filter(author_id=author_id, fan_out=True).update(
+            fan_out=False
+        )
+        return
+    backfill(follow.user_id, author_id)
+
+
+@transaction.atomic
+def follow_removed(follow):
+    """Очищает ленту после отписки от автора."""
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id, post__author_id=follow.author_id
+    ).delete()
+
+
+# Лента наполняется на стороне БД: INSERT ... SELECT на автора вместо
+# создания миллионов объектов TimelineEntry в Python
+BACKFILL_SQL = (
+    f'INSERT INTO {TimelineEntry._meta.db_table} '
+    f'(user_id, post_id, pub_date) '
+    f'SELECT follow.user_id, post.id, post.pub_date '
+    f'FROM {Follow._meta.db_table} follow, ('
+    f'SELECT id, pub_date FROM {Post._meta.db_table} WHERE author_id = %s '
+    f'ORDER BY pub_date DESC, id DESC LIMIT %s) post '
+    f'WHERE follow.author_id = %s AND follow.fan_out AND NOT EXISTS ('
+    f'SELECT 1 FROM {TimelineEntry._meta.db_table} entry '
+    f'WHERE entry.user_id = follow.user_id AND entry.post_id = post.id)'
+)
+
+
+def _backfill_authors(author_ids):
+    with connection.cursor() as cursor:
+        for author_id in author_ids:
+            cursor.execute(
+                BACKFILL_SQL, [author_id, BACKFILL_COUNT, author_id]
+            )
+
+
+@transaction.atomic
+def rebuild():
+    """Заново строит все ленты по подпискам и счётчикам подписчиков.
+
+    Нужна после загрузки данных в обход сигналов; счётчики AuthorStats
+    к этому моменту должны быть актуальны.
+    """
+    TimelineEntry.objects.all().delete()
+    popular = AuthorStats.objects.filter(
+        followers_count__gte=FAN_OUT_LIMIT
+    ).values('user_id')
+    Follow.objects.exclude(author_id__in=popular).update(fan_out=True)
+    Follow.objects.filter(author_id__in=popular).update(fan_out=False)
+    authors = (
+        Follow.objects.filter(fan_out=True).order_by('author_id')
+        .values_list('author_id', flat=True).distinct()
+    )
+    _backfill_authors(list(authors))
+
+
+@transaction.atomic
+def rebalance():
+    """Возвращает раскладку авторам, у которых стало мало подписчиков.
+
+    Возвращает число таких авторов.
+    """
+    popular = AuthorStats.objects.filter(
+        followers_count__gte=FAN_OUT_RESUME_LIMIT
+    ).values('user_id')
+    authors = list(
+        Follow.objects.filter(fan_out=False)
+        .exclude(author_id__in=popular).order_by('author_id')
+        .values_list('author_id', flat=True).distinct()
+    )
+    Follow.objects.filter(author_id__in=authors).update(fan_out=True)
+    _backfill_authors(authors)
+    return len(authors)
+
+
+def get_timeline(user):
+    """Queryset постов ленты подписок пользователя.
+
+    Сортировать его нужно по TIMELINE_ORDERING: без авторов "на лету"
+    это порядок индекса записей ленты.
+    """
+    fan_in_authors = list(
+        Follow.objects.filter(user=user, fan_out=False)
+        .values_list('author_id', flat=True)
+    )
+    if not fan_in_authors:
+        return Post.objects.filter(timeline_entries__user=user).annotate(
+            timeline_date=F('timeline_entries__pub_date'),
+            timeline_post=F('timeline_entries__post_id'),
+        )
+    entries = TimelineEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.filter(
+        Q(pk__in=entries) | Q(author_id__in=fan_in_authors)
+    ).annotate(timeline_date=F('pub_date'), timeline_post=F('pk'))
@@ -0,0 +1,153 @@
+"""Потоковая проверка и нормализация загружаемых картинок.
+
+LimitedUploadHandler стоит первым в FILE_UPLOAD_HANDLERS и получает
+каждый кусок загрузки раньше, чем его сохранят в память или во временный
+файл. Файл больше IMAGE_UPLOAD_MAX_SIZE и картинка, которая по заголовку
+декодируется больше чем в IMAGE_MAX_PIXELS пикселей, дальше не
+передаются: вместо файла форма получает RejectedUpload с причиной. Так
+большая загрузка или "декомпрессионная бомба" стоит не больше нескольких
+кусков памяти.
+
+normalize декодирует принятую картинку в уменьшенном виде (draft для
+JPEG, reduce для остальных), поворачивает по EXIF, уменьшает до
+IMAGE_MAX_SIDE и перекодирует без метаданных.
+"""
+import io
+import os
+import warnings
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+# Сколько начальных байтов файла ждать заголовка картинки; EXIF в JPEG
+# стоит перед размерами и занимает до 64 КБ
+HEADER_LIMIT: int = 128 * 1024
+JPEG_QUALITY: int = 85
+
+
+class RejectedUpload(UploadedFile):
+    """Отклонённый при приёме файл: содержимого нет, есть причина."""
+
+    def __init__(self, name, content_type, reason):
+        super().__init__(io.BytesIO(), name, content_type, 0)
+        self.reason = reason
+
+
+def _decoded_size(image):
+    """Размер, в котором картинка будет декодирована.
+
+    draft только настраивает декодер JPEG на уменьшение в 2-8 раз,
+    сами пиксели не читаются.
+    """
+    side = settings.IMAGE_MAX_SIDE
+    image.draft('RGB', (side, side))
+    return image.size
+
+
+def _pixels_error(size):
+    width, height = size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        return (
+            f'Слишком большая картинка: {width}x{height}, допустимо '
+            f'не больше {settings.IMAGE_MAX_PIXELS} пикселей'
+        )
+    return None
+
+
+def _open(file_):
+    """Открывает картинку, читая только заголовок."""
+    with warnings.catch_warnings():
+        # Число пикселей проверяем сами, с меньшим пределом
+        warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+        return Image.open(file_)
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """Обрывает приём файла, как только он превысил пределы."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.header = b''
+        self.reason = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.reason is not None:
+            return None
+        self.received += len(raw_data)
+        if self.received > settings.IMAGE_UPLOAD_MAX_SIZE:
+            self.reason = (
+                'Слишком большой файл, допустимо не больше '
+                f'{filesizeformat(settings.IMAGE_UPLOAD_MAX_SIZE)}'
+            )
+            return None
+        if self.header is not None:
+            self.header += raw_data
+            self.check_header(complete=False)
+        # None не передаёт кусок следующим обработчикам
+        return raw_data if self.reason is None else None
+
+    def check_header(self, complete):
+        try:
+            size = _decoded_size(_open(io.BytesIO(self.header)))
+        except Image.DecompressionBombError as error:
+            self.reason = str(error)
+        except (OSError, SyntaxError, ValueError):
+            # Заголовок ещё не пришёл целиком или это не картинка -
+            # тогда её отклонит проверка ImageField
+            if complete or len(self.header) >= HEADER_LIMIT:
+                self.header = None
+            return
+        else:
+            self.reason = _pixels_error(size)
+        self.header = None
+
+    def file_complete(self, file_size):
+        if self.header:
+            self.check_header(complete=True)
+        if self.reason is None:
+            return None
+        return RejectedUpload(self.file_name, self.content_type, self.reason)
+
+
+def normalize(upload):
+    """Картинка не больше IMAGE_MAX_SIDE без метаданных.
+
+    Картинки с прозрачностью сохраняются в PNG, остальные - в JPEG.
+    """
+    upload.seek(0)
+    try:
+        image = _open(upload)
+        error = _pixels_error(_decoded_size(image))
+        if error:
+            raise ValidationError(error)
+        side = settings.IMAGE_MAX_SIDE
+        # reduce уменьшает картинку при декодировании в целое число раз
+        image.thumbnail((side, side), Image.LANCZOS, reducing_gap=2.0)
+        image = ImageOps.exif_transpose(image)
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise ValidationError('Не удалось прочитать картинку')
+    transparent = 'A' in image.getbands() or 'transparency' in image.info
+    icc_profile = image.info.get('icc_profile')
+    image = image.convert('RGBA' if transparent else 'RGB')
+    # EXIF и прочие метаданные не сохраняем, цветовой профиль - оставляем
+    image.info = {}
+    params = {'icc_profile': icc_profile} if icc_profile else {}
+    buffer = io.BytesIO()
+    if transparent:
+        image.save(buffer, 'PNG', optimize=True, **params)
+        extension, content_type = '.png', 'image/png'
+    else:
+        image.save(
+            buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True,
+            progressive=True, **params
+        )
+        extension, content_type = '.jpg', 'image/jpeg'
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    return SimpleUploadedFile(
+        stem + extension, buffer.getvalue(), content_type
+    )
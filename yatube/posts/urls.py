@@ -1,22 +1,47 @@
 from django.urls import path
 
-from . import views
+from . import syndication, views
 
 app_name = 'posts'
 
 urlpatterns = [
     # Главная страница
     path('', views.index, name='index'),
+    # Ленты RSS и Atom всего сайта
+    path('feeds/rss/', syndication.site_rss, name='site_rss'),
+    path('feeds/atom/', syndication.site_atom, name='site_atom'),
     # Страница группы
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    # Ленты группы
+    path('group/<slug:slug>/rss/', syndication.group_rss, name='group_rss'),
+    path(
+        'group/<slug:slug>/atom/', syndication.group_atom, name='group_atom'
+    ),
     # Профайл пользователя
     path('profile/<str:username>/', views.profile, name='profile'),
+    # Ленты автора
+    path(
+        'profile/<str:username>/rss/',
+        syndication.profile_rss,
+        name='profile_rss',
+    ),
+    path(
+        'profile/<str:username>/atom/',
+        syndication.profile_atom,
+        name='profile_atom',
+    ),
     # Новая запись
     path('create/', views.post_create, name='post_create'),
     # Просмотр записи
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     # Редактирование записи
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    # Следующая страница комментариев
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments',
+    ),
     # Создание комментария
     path(
         'posts/<int:post_id>/comment/', views.add_comment, name='add_comment'
@@ -1,24 +1,50 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import (
+    Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.cache import get_generation
+from core.paginator import CursorPaginator
+from core.replicas import read_replica
+
+from . import export as exporter
+from . import images
+from .conditional import (
+    conditional_page, group_scopes, index_scopes, post_scopes, profile_scopes,
+)
+from .feeds import COMMENT_ORDERING, for_comments, for_feed
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Comment, Follow, Group, Post, User
+from .stats import get_stats
+from .timeline import TIMELINE_ORDERING, get_timeline
 
 POST_COUNT: int = 10
+COMMENT_COUNT: int = 20
+
+
+def _comments_page(post_id, cursor):
+    """Страница комментариев поста, следующая за курсором."""
+    comments = for_comments(Comment.objects.filter(post_id=post_id))
+    paginator = CursorPaginator(comments, COMMENT_COUNT, COMMENT_ORDERING)
+    return paginator.get_page(cursor)
 
 
+@read_replica
+@conditional_page(index_scopes)
 def index(request):
     """Главная страница проекта Yatube."""
-    posts = Post.objects.all()
-    paginator = Paginator(posts, POST_COUNT)
-    # Из URL извлекаем номер запрошенной страницы - это значение параметра page
-    page_number = request.GET.get('page')
-    # Получаем набор записей для страницы с запрошенным номером
-    page_obj = paginator.get_page(page_number)
-    # Отдаем в словаре контекста
+    posts = for_feed(Post.objects.all())
+    paginator = CursorPaginator(posts, POST_COUNT)
+    # Из URL извлекаем курсор запрошенной страницы - параметр cursor
+    cursor = request.GET.get('cursor')
+    # Получаем набор записей, следующих за курсором
+    page_obj = paginator.get_page(cursor)
+    # Отдаем в словаре контекста; generation - версия кэша ленты
     context = {
         'page_obj': page_obj,
+        'generation': get_generation('posts', 'groups', 'users'),
     }
     return render(
         request,
@@ -27,19 +53,21 @@ def index(request):
     )
 
 
+@read_replica
+@conditional_page(group_scopes)
 def group_posts(request, slug):
     """Информация о группах проекта Yatube.
     Посты отфильтрованные по группе.
     """
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, POST_COUNT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = for_feed(group.posts.all())
+    paginator = CursorPaginator(posts, POST_COUNT)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
 
     context = {
         'group': group,
         'page_obj': page_obj,
+        'generation': get_generation(f'group:{group.pk}', 'users'),
     }
     return render(
         request,
@@ -48,26 +76,29 @@ def group_posts(request, slug):
     )
 
 
+@read_replica
+@conditional_page(profile_scopes)
 def profile(request, username):
     """Страница профайла пользователя."""
     # Запрос к модели и создание словаря контекста
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    paginator = Paginator(posts, POST_COUNT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    posts_count = posts.count()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = for_feed(author.posts.all())
+    paginator = CursorPaginator(posts, POST_COUNT)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     following = author.following.exists()
-    following_count = author.following.all().count()
-    follower_count = author.follower.all().count()
+    # Счётчики денормализованы и выбраны вместе с автором
+    stats = get_stats(author)
 
     context = {
         'page_obj': page_obj,
         'author': author,
-        'posts_count': posts_count,
+        'posts_count': stats.posts_count,
         'following': following,
-        'following_count': following_count,
-        'follower_count': follower_count,
+        'following_count': stats.followers_count,
+        'follower_count': stats.following_count,
+        'generation': get_generation(f'author:{author.pk}', 'groups'),
     }
     return render(
         request,
@@ -76,22 +107,24 @@ def profile(request, username):
     )
 
 
+@read_replica
+@conditional_page(post_scopes)
 def post_detail(request, post_id):
     """Страница отдельного поста."""
-    post = get_object_or_404(Post, pk=post_id)
-    author = post.author
-    posts_count = author.posts.count()
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    stats = get_stats(post.author)
+    # Остальные комментарии догружаются по ссылке "Показать ещё"
+    comments = _comments_page(post.pk, request.GET.get('comments'))
     form = CommentForm(request.POST or None)
-    following_count = author.following.all().count()
-    follower_count = author.follower.all().count()
     context = {
         'post': post,
-        'posts_count': posts_count,
+        'posts_count': stats.posts_count,
         'form': form,
         'comments': comments,
-        'following_count': following_count,
-        'follower_count': follower_count,
+        'following_count': stats.followers_count,
+        'follower_count': stats.following_count,
     }
     return render(
         request,
@@ -100,6 +133,32 @@ def post_detail(request, post_id):
     )
 
 
+@read_replica
+@conditional_page(post_scopes)
+def post_comments(request, post_id):
+    """Следующая страница комментариев: HTML-фрагмент или JSON."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = _comments_page(post.pk, request.GET.get('cursor'))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created,
+                }
+                for comment in comments
+            ],
+            'next_cursor': comments.paginator.next_cursor,
+        })
+    return render(
+        request,
+        'includes/comment_list.html',
+        {'post': post, 'comments': comments},
+    )
+
+
 @login_required
 def post_edit(request, post_id):
     """Страница редактирования поста."""
@@ -119,6 +178,8 @@ def post_edit(request, post_id):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if post.image and 'image' in form.changed_data:
+            images.schedule(post)
         return redirect('posts:post_detail', post_id=post.pk)
     return render(request, 'posts/create_post.html', context)
 
@@ -131,6 +192,9 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if post.image:
+            # Варианты картинки создаются в фоне, ответ их не ждёт
+            images.schedule(post)
         return redirect('posts:profile', username=post.author)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -149,15 +213,13 @@ def add_comment(request, post_id):
 
 
 @login_required
+@read_replica
 def follow_index(request):
     """Страница подписок пользователя."""
-    posts = (
-        Post.objects.select_related()
-        .filter(author__following__user=request.user)
-    )
-    paginator = Paginator(posts, POST_COUNT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Лента материализована: посты уже разложены по подписчикам
+    posts = for_feed(get_timeline(request.user))
+    paginator = CursorPaginator(posts, POST_COUNT, TIMELINE_ORDERING)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     context = {
         'page_obj': page_obj,
     }
@@ -173,9 +235,9 @@ def profile_follow(request, username):
     """Подписаться на автора."""
     user = request.user
     author = get_object_or_404(User, username=username)
-    is_exist = Follow.objects.filter(user=user, author=author).exists()
-    if user != author and not is_exist:
-        Follow.objects.create(user=user, author=author)
+    if user != author:
+        # Уникальность пары защищает от двойной подписки при гонке
+        Follow.objects.get_or_create(user=user, author=author)
     return redirect(
         'posts:profile',
         username=username
@@ -192,3 +254,39 @@ def profile_unfollow(request, username):
         'posts:profile',
         username=username
     )
+
+
+@staff_member_required
+def export(request, kind):
+    """Потоковая выгрузка таблицы kind в JSON Lines или CSV."""
+    if kind not in exporter.EXPORTS:
+        raise Http404
+    export_format = request.GET.get('format', 'jsonl')
+    if export_format not in exporter.FORMATS:
+        return HttpResponseBadRequest('Неизвестный формат')
+    try:
+        since, until = (
+            exporter.parse_moment(request.GET[name], end=end)
+            if request.GET.get(name) else None
+            for name, end in (('since', False), ('until', True))
+        )
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    compress = bool(request.GET.get('gzip'))
+    rows = exporter.get_rows(
+        kind, since, until, request.GET.get('author') or None
+    )
+    filename = f'{kind}.{export_format}'
+    content_type = exporter.CONTENT_TYPES[export_format]
+    if compress:
+        # Сжатый файл, а не сжатая передача: браузер сохранит .gz как есть
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(
+        exporter.encode(
+            exporter.serialize(kind, rows, export_format), compress
+        ),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
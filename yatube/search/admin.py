@@ -0,0 +1,31 @@
+"""Поиск в админке через поисковый индекс."""
+from django.contrib import messages
+
+from .backends import get_backend
+
+# Админка показывает лучшие совпадения, а не все подряд. Их ключи
+# уходят в IN (...) одним запросом, поэтому предел ниже ограничения
+# SQLite до 3.32 на 999 параметров
+ADMIN_RESULT_LIMIT: int = 900
+
+
+class IndexSearchMixin:
+    """Заменяет LIKE-поиск по search_fields выборкой из индекса.
+
+    search_kind - тип документов модели в индексе. Если совпадений больше
+    ADMIN_RESULT_LIMIT, админка предупреждает, что список обрезан.
+    """
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        hits = get_backend().search(
+            search_term, ADMIN_RESULT_LIMIT, kinds=(self.search_kind,)
+        )
+        if len(hits) >= ADMIN_RESULT_LIMIT:
+            messages.warning(request, (
+                f'Показаны {ADMIN_RESULT_LIMIT} лучших совпадений, '
+                'остальные отброшены - уточните запрос'
+            ))
+        return queryset.filter(pk__in=[hit.object_id for hit in hits]), False
@@ -0,0 +1,184 @@
+"""Бэкенды полнотекстового поиска.
+
+Индексируются тексты постов и комментариев; результат поиска - список
+совпадений Hit, отсортированный по релевантности. Бэкенд выбирается
+настройкой SEARCH_BACKEND.
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+POST = 'post'
+COMMENT = 'comment'
+
+# Совпадение: что нашлось, к какому посту относится и фрагмент текста
+Hit = namedtuple('Hit', 'kind object_id post_id snippet')
+
+WORD_RE = re.compile(r'\w+')
+# Служебные символы вместо тегов: текст экранируется уже после FTS5
+MARK_START, MARK_END = '\x02', '\x03'
+
+
+def highlight(text):
+    """Экранирует текст и превращает служебные метки в <mark>."""
+    return mark_safe(
+        escape(text)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+class BaseSearchBackend:
+    """Интерфейс бэкенда поиска."""
+
+    def index(self, kind, object_id, post_id, text):
+        """Добавляет или обновляет документ."""
+        raise NotImplementedError
+
+    def index_many(self, kind, rows):
+        """Индексирует пачку (object_id, post_id, text)."""
+        for object_id, post_id, text in rows:
+            self.index(kind, object_id, post_id, text)
+
+    def remove(self, kind, object_id):
+        """Удаляет документ из индекса."""
+        raise NotImplementedError
+
+    def search(self, query, limit, offset=0, kinds=(POST, COMMENT)):
+        """Возвращает список Hit по убыванию релевантности."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Очищает индекс перед полной перестройкой."""
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """Поиск по виртуальной таблице FTS5 в базе SQLite.
+
+    rowid документа кодирует его тип и pk, поэтому обновление и удаление -
+    выборка по первичному ключу таблицы индекса.
+    """
+    table = 'search_index'
+    kinds = (POST, COMMENT)
+    snippet_tokens = 32
+
+    def _rowid(self, kind, object_id):
+        return object_id * len(self.kinds) + self.kinds.index(kind)
+
+    def _split(self, rowid):
+        object_id, kind = divmod(rowid, len(self.kinds))
+        return self.kinds[kind], object_id
+
+    def index(self, kind, object_id, post_id, text):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {self.table} (rowid, text, post_id) '
+                'VALUES (%s, %s, %s)',
+                [self._rowid(kind, object_id), text, post_id],
+            )
+
+    def index_many(self, kind, rows):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {self.table} (rowid, text, post_id) '
+                'VALUES (%s, %s, %s)',
+                [
+                    (self._rowid(kind, object_id), text, post_id)
+                    for object_id, post_id, text in rows
+                ],
+            )
+
+    def remove(self, kind, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [self._rowid(kind, object_id)],
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    @staticmethod
+    def to_match(query):
+        """Переводит запрос пользователя в выражение MATCH.
+
+        Каждое слово ищется по префиксу, все слова обязательны; синтаксис
+        FTS5 из ввода пользователя не пропускается.
+        """
+        return ' '.join(
+            '"{}"*'.format(word) for word in WORD_RE.findall(query)
+        )
+
+    def search(self, query, limit, offset=0, kinds=(POST, COMMENT)):
+        match = self.to_match(query)
+        if not match:
+            return []
+        parity = [self.kinds.index(kind) for kind in kinds]
+        # Модуль и остатки - параметры: литеральный % в SQL ломает
+        # подстановку параметров в журнал запросов при DEBUG
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, post_id, snippet({self.table}, 0, '
+                f"'{MARK_START}', '{MARK_END}', '…', %s) "
+                f'FROM {self.table} WHERE {self.table} MATCH %s '
+                f'AND rowid %% %s IN ({", ".join(["%s"] * len(parity))}) '
+                'ORDER BY rank LIMIT %s OFFSET %s',
+                [
+                    self.snippet_tokens, match, len(self.kinds), *parity,
+                    limit, offset,
+                ],
+            )
+            rows = cursor.fetchall()
+        return [
+            Hit(*self._split(rowid), post_id, highlight(snippet))
+            for rowid, post_id, snippet in rows
+        ]
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Поиск через LIKE для баз без FTS5; индекс не нужен."""
+
+    def index(self, kind, object_id, post_id, text):
+        pass
+
+    def remove(self, kind, object_id):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, query, limit, offset=0, kinds=(POST, COMMENT)):
+        from posts.models import Comment, Post
+
+        words = WORD_RE.findall(query)
+        if not words:
+            return []
+        hits = []
+        sources = (
+            (POST, Post.objects.values_list('pk', 'pk', 'text')),
+            (COMMENT, Comment.objects.values_list('pk', 'post_id', 'text')),
+        )
+        for kind, queryset in sources:
+            if kind not in kinds:
+                continue
+            for word in words:
+                queryset = queryset.filter(text__icontains=word)
+            hits.extend(
+                Hit(kind, object_id, post_id, escape(text))
+                for object_id, post_id, text in queryset[:offset + limit]
+            )
+        return hits[offset:offset + limit]
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    """Бэкенд из настройки SEARCH_BACKEND."""
+    return import_string(settings.SEARCH_BACKEND)()
@@ -0,0 +1,38 @@
+"""Полная перестройка поискового индекса."""
+from django.db import transaction
+
+from posts.models import Comment, Post
+
+from .backends import COMMENT, POST, get_backend
+
+BATCH_SIZE = 1000
+
+
+def _batches(queryset):
+    """Пачки строк (pk, post_id, text) по возрастанию pk."""
+    last_pk = 0
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk')[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1][0]
+
+
+@transaction.atomic
+def rebuild(backend=None):
+    """Заново индексирует все посты и комментарии; возвращает их число."""
+    backend = backend or get_backend()
+    backend.clear()
+    count = 0
+    sources = (
+        (POST, Post.objects.values_list('pk', 'pk', 'text')),
+        (COMMENT, Comment.objects.values_list('pk', 'post_id', 'text')),
+    )
+    for kind, queryset in sources:
+        for batch in _batches(queryset):
+            backend.index_many(kind, batch)
+            count += len(batch)
+    return count
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from search.indexing import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов и комментариев'
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Проиндексировано записей: {count}')
+        )
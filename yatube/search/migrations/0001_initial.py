@@ -0,0 +1,42 @@
+from django.db import migrations
+
+from search.backends import COMMENT, POST, SQLiteFTSBackend
+
+TABLE = SQLiteFTSBackend.table
+
+
+def create_index(apps, schema_editor):
+    """Создаёт таблицу FTS5 и индексирует существующие записи."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+        'text, post_id UNINDEXED, '
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    backend = SQLiteFTSBackend()
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    backend.index_many(
+        POST, Post.objects.values_list('pk', 'pk', 'text').iterator()
+    )
+    backend.index_many(
+        COMMENT,
+        Comment.objects.values_list('pk', 'post_id', 'text').iterator(),
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_author_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
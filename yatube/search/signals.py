@@ -0,0 +1,29 @@
+"""Синхронизация поискового индекса с постами и комментариями."""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from posts.models import Comment, Post
+
+from .backends import COMMENT, POST, get_backend
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, **kwargs):
+    get_backend().index(POST, instance.pk, instance.pk, instance.text)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    get_backend().remove(POST, instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, **kwargs):
+    get_backend().index(
+        COMMENT, instance.pk, instance.post_id, instance.text
+    )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    get_backend().remove(COMMENT, instance.pk)
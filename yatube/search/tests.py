@@ -0,0 +1,124 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+from . import admin as search_admin
+from .backends import COMMENT, POST, Hit, get_backend
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.admin = User.objects.create_superuser(
+            username='TestAdmin', email='admin@example.com', password='pass'
+        )
+        cls.post = Post.objects.create(
+            text='Рецепт борща с пампушками',
+            author=cls.author,
+        )
+        cls.other_post = Post.objects.create(
+            text='Заметки о <b>погоде</b>',
+            author=cls.author,
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.other_post,
+            author=cls.author,
+            text='А борщ лучше варить зимой',
+        )
+
+    def search(self, query, kinds=(POST, COMMENT)):
+        return {
+            (hit.kind, hit.object_id)
+            for hit in get_backend().search(query, 10, kinds=kinds)
+        }
+
+    def test_index_follows_saves_and_deletes(self):
+        """Индекс обновляется при создании, правке и удалении."""
+        self.assertEqual(
+            self.search('борщ'),
+            {(POST, self.post.pk), (COMMENT, self.comment.pk)},
+        )
+        self.post.text = 'Рецепт окрошки'
+        self.post.save()
+        self.comment.delete()
+        self.assertEqual(self.search('борщ'), set())
+        self.assertEqual(self.search('окрошк'), {(POST, self.post.pk)})
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS5 во вводе не ломают запрос."""
+        for query in ('"', 'борщ OR', 'NEAR(', '*', 'борщ -пампушк'):
+            with self.subTest(query=query):
+                get_backend().search(query, 10)
+
+    def test_results_page_highlights_matches(self):
+        """Страница поиска подсвечивает совпадения и экранирует текст."""
+        response = self.client.get(reverse('search:search'), {'q': 'погод'})
+        results = response.context['results']
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['post'], self.other_post)
+        self.assertContains(response, '&lt;b&gt;<mark>погоде</mark>')
+
+    @override_settings(DEBUG=True)
+    def test_search_with_debug(self):
+        """С DEBUG запрос попадает в журнал без ошибок форматирования."""
+        hits = self.search('зимой', kinds=(COMMENT,))
+        self.assertEqual([kind for kind, _ in hits], [COMMENT])
+
+    def test_rebuild_search_index(self):
+        """Команда rebuild_search_index восстанавливает индекс."""
+        get_backend().clear()
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('3', out.getvalue())
+        self.assertEqual(self.search('борщ', kinds=(POST,)), {
+            (POST, self.post.pk),
+        })
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке находит посты по индексу."""
+        self.client.force_login(self.admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'пампушк'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.post]
+        )
+
+    def test_admin_warns_about_truncated_results(self):
+        """Обрезанный по пределу список помечается предупреждением."""
+        self.client.force_login(self.admin)
+        url = reverse('admin:posts_post_changelist')
+        response = self.client.get(url, {'q': 'пампушк'})
+        self.assertEqual(list(response.context['messages']), [])
+        with mock.patch.object(search_admin, 'ADMIN_RESULT_LIMIT', 1):
+            response = self.client.get(url, {'q': 'пампушк'})
+        self.assertIn(
+            'уточните запрос', str(list(response.context['messages'])[0])
+        )
+
+    def test_admin_result_limit_fits_in_one_query(self):
+        """Полный список совпадений выбирается одним запросом к SQLite."""
+        self.client.force_login(self.admin)
+        # Кроме найденного поста - ключи несуществующих
+        missing = range(10 ** 6, 10 ** 6 + search_admin.ADMIN_RESULT_LIMIT)
+        hits = [Hit(POST, self.post.pk, None, '')] + [
+            Hit(POST, pk, None, '') for pk in missing[1:]
+        ]
+        with mock.patch.object(search_admin, 'get_backend') as backend:
+            backend.return_value.search.return_value = hits
+            response = self.client.get(
+                reverse('admin:posts_post_changelist'), {'q': 'пампушк'}
+            )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.post]
+        )
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'search'
+
+urlpatterns = [
+    # Поиск по постам и комментариям
+    path('', views.search, name='search'),
+]
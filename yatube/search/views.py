@@ -0,0 +1,47 @@
+from django.shortcuts import render
+
+from posts.feeds import for_feed
+from posts.models import Post
+
+from .backends import get_backend
+
+RESULT_COUNT: int = 10
+# Глубже ранжирование теряет смысл, а OFFSET становится дорогим
+MAX_PAGE: int = 50
+
+
+def _page_number(value):
+    try:
+        return min(max(int(value), 1), MAX_PAGE)
+    except (TypeError, ValueError):
+        return 1
+
+
+def search(request):
+    """Поиск по постам и комментариям, лучшие совпадения - первыми."""
+    query = request.GET.get('q', '').strip()
+    page = _page_number(request.GET.get('page'))
+    results = []
+    has_next = False
+    if query:
+        # Лишняя запись показывает, есть ли следующая страница
+        hits = get_backend().search(
+            query, RESULT_COUNT + 1, (page - 1) * RESULT_COUNT
+        )
+        has_next = len(hits) > RESULT_COUNT and page < MAX_PAGE
+        hits = hits[:RESULT_COUNT]
+        posts = for_feed(Post.objects.all()).in_bulk(
+            {hit.post_id for hit in hits}
+        )
+        results = [
+            {'hit': hit, 'post': posts[hit.post_id]}
+            for hit in hits if hit.post_id in posts
+        ]
+    context = {
+        'query': query,
+        'results': results,
+        'page': page,
+        'previous_page': page - 1 if page > 1 else None,
+        'next_page': page + 1 if has_next else None,
+    }
+    return render(request, 'search/results.html', context)
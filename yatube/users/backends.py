@@ -0,0 +1,47 @@
+"""Бэкенд авторизации с кэшем пользователя.
+
+AuthenticationMiddleware на каждом запросе загружает request.user по id
+из сессии. CachedModelBackend берёт пользователя из кэша и читает
+auth_user только при промахе. Сохранение и удаление пользователя
+(правка профиля, смена пароля, вход) сбрасывают его запись в кэше
+(users.signals). Хеш пароля в сессии сверяется с кэшированным
+пользователем, поэтому после смены пароля старые сессии не действуют.
+
+Сброс виден всем процессам сервера, только если кэш у них общий
+(CACHE_SHARED). Иначе бэкенд не кэширует и работает как ModelBackend.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+
+# Запись сбрасывается сигналами; срок - страховка от изменений в обход
+# save, например через update
+USER_CACHE_TIMEOUT: int = 60 * 15
+
+
+def user_cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который загружает пользователя сессии из кэша."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username, password, **kwargs)
+        if user is None and password is not None:
+            # Следующий в списке ModelBackend проверил бы пароль повторно
+            raise PermissionDenied
+        return user
+
+    def get_user(self, user_id):
+        if not settings.CACHE_SHARED:
+            return super().get_user(user_id)
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,16 @@
+"""Обработчики сигналов модели пользователя."""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import user_cache_key
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """Сбрасывает кэш пользователя: профиль или пароль изменились."""
+    cache.delete(user_cache_key(instance.pk))
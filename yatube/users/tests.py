@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+User = get_user_model()
+CACHED_SESSIONS = 'django.contrib.sessions.backends.cached_db'
+MODEL_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+
+
+@override_settings(CACHE_SHARED=True, SESSION_ENGINE=CACHED_SESSIONS)
+class CachedAuthTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='TestUser', password='old-password-123'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.login(username='TestUser', password='old-password-123')
+
+    def auth_queries(self, url):
+        """Запросы страницы к таблицам сессий и пользователей."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [
+            query['sql'] for query in queries
+            if 'django_session' in query['sql'] or 'auth_user' in query['sql']
+        ]
+
+    def test_no_auth_queries_when_cached(self):
+        """Сессия и пользователь берутся из кэша, а не из базы."""
+        url = reverse('about:author')
+        self.client.get(url)
+        response, queries = self.auth_queries(url)
+        self.assertEqual(queries, [])
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_cache_invalidated_on_profile_change(self):
+        """Правка профиля видна на следующей странице."""
+        url = reverse('posts:profile', kwargs={'username': 'TestUser'})
+        self.client.get(url)
+        self.user.first_name = 'Новое имя'
+        self.user.save()
+        response, queries = self.auth_queries(reverse('about:author'))
+        self.assertTrue(queries)
+        self.assertEqual(response.context['user'].first_name, 'Новое имя')
+
+    def test_password_change_ends_other_sessions(self):
+        """После смены пароля другие сессии пользователя не действуют."""
+        other = Client()
+        other.login(username='TestUser', password='old-password-123')
+        url = reverse('about:author')
+        other.get(url)
+        response = self.client.post(reverse('users:password_change'), {
+            'old_password': 'old-password-123',
+            'new_password1': 'new-password-456',
+            'new_password2': 'new-password-456',
+        })
+        self.assertRedirects(response, reverse('users:password_change_done'))
+        # Сессия, сменившая пароль, остаётся, остальные - нет
+        self.assertTrue(
+            self.client.get(url).context['user'].is_authenticated
+        )
+        self.assertFalse(other.get(url).context['user'].is_authenticated)
+
+    def test_model_backend_session_still_valid(self):
+        """Сессии, созданные через ModelBackend, по-прежнему действуют."""
+        client = Client()
+        client.force_login(self.user, backend=MODEL_BACKEND)
+        response = client.get(reverse('about:author'))
+        self.assertEqual(response.context['user'], self.user)
+
+    @override_settings(CACHE_SHARED=False)
+    def test_no_user_cache_without_shared_cache(self):
+        """Без общего кэша пользователь каждый раз читается из базы."""
+        url = reverse('about:author')
+        self.client.get(url)
+        response, queries = self.auth_queries(url)
+        self.assertTrue(
+            any('auth_user' in query for query in queries)
+        )
+        self.assertEqual(response.context['user'], self.user)
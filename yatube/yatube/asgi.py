@@ -0,0 +1,24 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 has no ASGI handler, so requests are served by the WSGI
+application in a bounded thread pool (see core.asgi).
+
+Run it with any ASGI server, for example::
+
+    uvicorn yatube.asgi:application
+"""
+
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import WsgiToAsgi
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = WsgiToAsgi(
+    get_wsgi_application(), max_workers=settings.ASGI_THREADS
+)
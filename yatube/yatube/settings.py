@@ -42,6 +42,8 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',  # Расширяет и изменяет работу django.contrib.auth
     'core.apps.CoreConfig',  # Приложение для хранения всякого
     'about.apps.AboutConfig',  # Статичные страницы
+    'search.apps.SearchConfig',  # Полнотекстовый поиск
+    'api.apps.ApiConfig',  # JSON API для чтения
     'django.contrib.admin',
     'django.contrib.auth',  # Приложение для регистрация и авторизация пользователей
     'django.contrib.contenttypes',
@@ -53,6 +55,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым: замеряет обработку запроса всеми остальными
+    'core.timing.ServerTimingMiddleware',
+    # Закрепляет пользователя за основной базой после записи
+    'core.replicas.PrimaryPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -70,6 +76,14 @@ INTERNAL_IPS = [
 
 ROOT_URLCONF = 'yatube.urls'
 
+# Пользователь сессии загружается из кэша, а не из auth_user (только
+# с общим кэшем, CACHE_SHARED). ModelBackend остаётся для сессий,
+# созданных до появления кэширующего бэкенда
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -86,7 +100,8 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени отрисовки для Server-Timing
+        'BACKEND': 'core.timing.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -106,6 +121,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Потоков, обрабатывающих запросы под ASGI-сервером (yatube.asgi)
+ASGI_THREADS = 10
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -114,7 +132,41 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        # Соединение переиспользуется запросами потока, а не открывается
+        # заново на каждый
+        'CONN_MAX_AGE': 60,
+    },
+    # Реплики для чтения лент добавляются сюда же. Для проверки локально
+    # подойдут копии основной базы, их обновляет команда sync_replicas:
+    # 'replica1': {
+    #     'ENGINE': 'django.db.backends.sqlite3',
+    #     'NAME': os.path.join(BASE_DIR, 'replica1.sqlite3'),
+    #     'CONN_MAX_AGE': 60,
+    #     'TEST': {'MIRROR': 'default'},
+    # },
+}
+
+# Запись - в default, чтение лент и постов - в реплики (core.replicas)
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# Сколько секунд после записи пользователь читает из основной базы
+REPLICA_PIN_SECONDS = 5
+# Наибольшее отставание реплик: страницы, изменённые позже, читаются
+# из основной базы, чтобы в кэш не попали старые данные
+REPLICA_LAG_SECONDS = 5
+
+# PRAGMA, выполняемые при подключении к SQLite (core.db)
+SQLITE_PRAGMAS = {
+    # Читатели не блокируются записью, писатель - чтением
+    'journal_mode': 'WAL',
+    # В режиме WAL fsync только при контрольной точке
+    'synchronous': 'NORMAL',
+    # Чтение файла базы через отображение в память, до 256 МБ
+    'mmap_size': 256 * 1024 * 1024,
+    # Кэш страниц соединения: отрицательное значение - в КБ
+    'cache_size': -64000,
+    # Сколько миллисекунд ждать блокировку, прежде чем вернуть ошибку
+    'busy_timeout': 5000,
 }
 
 
@@ -162,8 +214,63 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Число потоков пула фоновых задач (posts.executor); 0 - выполнять сразу
+# в текущем потоке
+BACKGROUND_WORKERS = 2
+# Предел очереди пула: задачи сверх него отбрасываются и ставятся
+# заново при следующем показе плейсхолдера
+BACKGROUND_QUEUE_LIMIT = 100
+# Форматы вариантов картинок по убыванию предпочтения: берётся первый,
+# который умеет сохранять установленный Pillow
+IMAGE_VARIANT_FORMATS = ('AVIF', 'WEBP', 'JPEG')
+
+# Загрузки проверяются на лету, до сохранения в память или на диск
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.LimitedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+# Пределы картинок: размер файла, число декодируемых пикселей и
+# наибольшая сторона сохранённой картинки
+IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_PIXELS = 16_000_000
+IMAGE_MAX_SIDE = 2048
+
+# Доля запросов, замеры которых сохраняются для страницы админки,
+# и сколько последних замеров хранить
+SERVER_TIMING_SAMPLE_RATE = 0.01
+SERVER_TIMING_SAMPLES = 200
+
+# Бэкенд поиска; для баз без FTS5 - search.backends.SimpleSearchBackend
+SEARCH_BACKEND = 'search.backends.SQLiteFTSBackend'
+
+# Кэш хранит поколения лент и фрагменты страниц. Общий для всех процессов
+# сервера кэш - memcached, его адрес задаётся переменной окружения
+# YATUBE_MEMCACHED (например, 127.0.0.1:11211). Без неё у каждого
+# процесса свой LocMemCache: сброс поколения в одном процессе не виден
+# другим, поэтому тогда поколения живут GENERATION_TIMEOUT секунд и
+# процессы расходятся не дольше этого срока. Срок равен самому долгому
+# кэшу под поколением - фрагментам страниц ({% cache 21600 %}): более
+# короткий обновлял бы их и валидаторы Last-Modified/ETag раньше, чем
+# они устаревают. Несколько процессов сервера без memcached поэтому
+# могут показывать старые страницы до 6 часов
+MEMCACHED_LOCATION = os.environ.get('YATUBE_MEMCACHED')
+CACHE_SHARED = bool(MEMCACHED_LOCATION)
+if CACHE_SHARED:
+    CACHES = {
+        'default': {
+            # Бэкенды с подсчётом попаданий для Server-Timing
+            'BACKEND': 'core.timing.TimedMemcachedCache',
+            'LOCATION': MEMCACHED_LOCATION,
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.timing.TimedLocMemCache',
+        }
+    }
+GENERATION_TIMEOUT = None if CACHE_SHARED else 60 * 60 * 6
+if CACHE_SHARED:
+    # Сессии читаются из кэша, база - только при промахе и при записи
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
@@ -4,9 +4,18 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import request_timings
+from posts.views import export
+
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
     path('about/', include('about.urls', namespace='about')),
+    path('search/', include('search.urls', namespace='search')),
+    # Версия API - в пути: несовместимые изменения пойдут в api/v2/
+    path('api/v1/', include('api.urls', namespace='api')),
+    # Страницы персонала - до admin.site.urls, иначе их перехватит админка
+    path('admin/timings/', request_timings, name='request_timings'),
+    path('admin/export/<str:kind>/', export, name='export'),
     path('admin/', admin.site.urls),
     # Доступ к авторизации
     path('auth/', include('users.urls', namespace='users')),